@@ -0,0 +1,164 @@
+"""
+Clientes falsos (sem rede) usados pelos benchmarks.
+Imitam apenas a parte da API da OpenAI que o projeto usa.
+"""
+import asyncio
+import hashlib
+import random
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
+
+EMBED_DIM = 1536
+
+
+def fake_embedding(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim)
+    return vec / np.linalg.norm(vec)
+
+
+class FakeEmbeddings:
+    def __init__(self, latency: float = 0.0, dim: int = EMBED_DIM):
+        self.latency = latency
+        self.dim = dim
+        self.calls = 0
+
+    def create(self, input, model):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        data = [SimpleNamespace(embedding=fake_embedding(text, self.dim).tolist()) for text in input]
+        tokens = sum(len(text.split()) for text in input)
+        return SimpleNamespace(data=data, usage=SimpleNamespace(total_tokens=tokens))
+
+
+class FakeOpenAI:
+    """Substituto de openai.OpenAI para o parâmetro `client`/`embedding_client`."""
+
+    embedding_latency = 0.0
+
+    def __init__(self, api_key=None, latency=None, dim=EMBED_DIM, **kwargs):
+        self.embeddings = FakeEmbeddings(
+            latency=self.embedding_latency if latency is None else latency, dim=dim
+        )
+
+
+class HashedNgramEmbeddings:
+    """
+    Embeddings determinísticos e com alguma semântica lexical: palavras (sem acentos, em
+    minúsculas) e seus trigramas de caracteres são espalhados por hashing em `dim` posições
+    com sinal, com peso log(1 + tf). Textos que compartilham palavras ou radicais ficam
+    próximos, o que basta para comparar configurações de busca sem a API.
+    """
+
+    def __init__(self, dim: int = 512, trigram_weight: float = 0.5):
+        from src.rerankers import tokenize
+
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self.tokenize = tokenize
+        self.calls = 0
+        self._features = {}
+
+    def _word_features(self, word):
+        features = self._features.get(word)
+        if features is None:
+            padded = f" {word} "
+            grams = [(word, 1.0)] + [(padded[i:i + 3], self.trigram_weight) for i in range(len(padded) - 2)]
+            features = []
+            for gram, weight in grams:
+                h = zlib.crc32(gram.encode("utf-8"))
+                features.append((h % self.dim, weight if (h >> 31) & 1 else -weight))
+            self._features[word] = features
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        counts = {}
+        for word in self.tokenize(text):
+            counts[word] = counts.get(word, 0) + 1
+        vec = np.zeros(self.dim)
+        for word, count in counts.items():
+            tf = np.log1p(count)
+            for index, weight in self._word_features(word):
+                vec[index] += weight * tf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def create(self, input, model):
+        self.calls += 1
+        data = [SimpleNamespace(embedding=self.embed(text).tolist()) for text in input]
+        tokens = sum(len(text.split()) for text in input)
+        return SimpleNamespace(data=data, usage=SimpleNamespace(total_tokens=tokens))
+
+
+class HashedNgramOpenAI:
+    """Substituto de openai.OpenAI com os embeddings de HashedNgramEmbeddings."""
+
+    def __init__(self, dim: int = 512, **kwargs):
+        self.embeddings = HashedNgramEmbeddings(dim=dim)
+
+
+class FakeChatCompletions:
+    def __init__(self, latency: float = 0.0, rate_limit_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.calls = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def create(self, model, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+            limited = self._random.random() < self.rate_limit_rate
+            if limited:
+                self.rate_limited += 1
+        if limited:
+            response = httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+            raise openai.RateLimitError("rate limit (stub)", response=response, body=None)
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        content = f"Contexto sintético {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+        usage = SimpleNamespace(prompt_tokens=len(prompt.split()), completion_tokens=len(content.split()))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+class FakeChatOpenAI:
+    """Substituto de openai.OpenAI para o parâmetro `client` do ContextGenerator."""
+
+    def __init__(self, latency: float = 0.0, rate_limit_rate: float = 0.0):
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(latency, rate_limit_rate))
+
+
+def fake_chat_model(latency: float = 0.0, reply=lambda messages: "Resposta sintética."):
+    """
+    Runnable no lugar de ChatOpenAI (hyde_rag / llm_with_tools do Agent), com os
+    caminhos síncrono e assíncrono; a resposta nunca pede ferramentas.
+    """
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    def message(messages):
+        content = reply(messages)
+        input_tokens = sum(len(str(m.content).split()) for m in messages)
+        output_tokens = len(content.split())
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens,
+        })
+
+    def invoke(messages):
+        time.sleep(latency)
+        return message(messages)
+
+    async def ainvoke(messages):
+        await asyncio.sleep(latency)
+        return message(messages)
+
+    return RunnableLambda(invoke, afunc=ainvoke)
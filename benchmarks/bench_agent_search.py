@@ -0,0 +1,74 @@
+"""
+Latência por chamada de Agent.search_text antes e depois do handle de busca
+reutilizado pelo Agent. Os clientes de LLM e de embeddings são substituídos por
+stubs locais e os dados gerados ficam em um diretório temporário.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_agent_search --queries 20
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import src.agent as agent_module
+from src.agent import Agent
+from src.document_processor import ContextGenerator
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import FakeChatOpenAI, FakeOpenAI
+
+DOC_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "Dom_Casmurro.txt"
+
+
+def legacy_search_text(agent: Agent, query: str, k: int = 3):
+    """Reproduz o search_text original: recarrega corpus e índice a cada chamada."""
+    json_path = agent.context_generator._json_path()
+    with open(json_path, "r", encoding="utf-8") as file:
+        json_data = json.load(file)
+    vector_db = SimpleVectorDB(name=Path(agent.doc_path).stem, client=agent.embedding_client)
+    vector_db.load_data(json_data)
+    return vector_db.search(query, k=k)
+
+
+def measure(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(
+        f"{label:<28} mean={statistics.mean(timings):8.2f} ms  "
+        f"p50={statistics.median(timings):8.2f} ms  max={max(timings):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    agent_module.USE_HYDE = False
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        agent = Agent(doc_path=str(DOC_PATH), embedding_client=FakeOpenAI())
+        agent.context_generator = ContextGenerator(doc_source=str(DOC_PATH), client=FakeChatOpenAI())
+        agent.search_text("aquecimento")  # gera contextos e índice uma única vez
+        queries = [f"Quem é Capitu? ({i})" for i in range(args.queries)]
+
+        report("antes (recarrega tudo)", measure(lambda q: legacy_search_text(agent, q), queries))
+        report("depois (handle reutilizado)", measure(agent.search_text, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Recall@k vs. latência do backend IVF comparado à busca exata, em vetores sintéticos
+agrupados (mistura de gaussianas normalizadas, mais próxima de embeddings reais do que
+ruído uniforme).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_ann --size 200000 --dim 256 --nprobe 1,4,16,64
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from src.vector_index import ExactIndex, IVFIndex
+
+
+def clustered_vectors(rng, n, dim, centers, spread=1.5):
+    # `spread` é a norma esperada do ruído em relação ao centro (que tem norma 1).
+    noise = rng.standard_normal((n, dim), dtype=np.float32) * (spread / np.sqrt(dim))
+    vectors = centers[rng.integers(len(centers), size=n)] + noise
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def run_queries(index, queries, k):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        indices, _ = index.search(query, k)
+        timings.append((time.perf_counter() - start) * 1000)
+        results.append(indices)
+    return statistics.median(timings), results
+
+
+def recall_at_k(approx, exact, k):
+    return float(np.mean([len(set(a[:k]) & set(e[:k])) / k for a, e in zip(approx, exact)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = raiz quadrada do tamanho do corpus.")
+    parser.add_argument("--nprobe", default="1,4,16,64")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = clustered_vectors(rng, args.size, args.dim, centers)
+    queries = clustered_vectors(rng, args.queries, args.dim, centers)
+
+    exact = ExactIndex()
+    exact.build(vectors)
+    exact_ms, exact_results = run_queries(exact, queries, args.k)
+    print(f"n={args.size} dim={args.dim} k={args.k}")
+    print(f"exact               recall@{args.k}=1.000  latência={exact_ms:7.2f} ms")
+
+    ivf = IVFIndex(nlist=args.nlist)
+    start = time.perf_counter()
+    ivf.build(vectors)
+    print(f"ivf (nlist={len(ivf.list_ids)}) construído em {time.perf_counter() - start:.2f} s")
+    for nprobe in (int(p) for p in args.nprobe.split(",")):
+        ivf.nprobe = nprobe
+        ivf_ms, ivf_results = run_queries(ivf, queries, args.k)
+        print(
+            f"ivf nprobe={nprobe:<4}     recall@{args.k}={recall_at_k(ivf_results, exact_results, args.k):.3f}  "
+            f"latência={ivf_ms:7.2f} ms  ({exact_ms / ivf_ms:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cache semântico de respostas do Agent com clientes falsos (embeddings de n-gramas com
+hashing, HyDE e LLM com latência simulada): latência e chamadas ao LLM de uma sequência
+de perguntas repetidas e reformuladas, sem e com o cache, e a invalidação quando o
+documento muda.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_answer_cache --threshold 0.9 --llm-latency 0.3
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import src.agent as agent_module
+from src.agent import Agent
+from src.answer_cache import AnswerCache
+from src.document_processor import ContextGenerator
+from src.telemetry import telemetry
+
+from ._stubs import FakeChatOpenAI, HashedNgramOpenAI, fake_chat_model
+
+DOC_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "Dom_Casmurro.txt"
+
+# Cada grupo: a mesma pergunta com redações ligeiramente diferentes.
+QUESTION_GROUPS = [
+    ["Capitu traiu Bentinho?", "capitu traiu bentinho", "Capitu traiu o Bentinho?", "Será que Capitu traiu Bentinho?"],
+    ["Quem é José Dias?", "quem é josé dias", "Quem era José Dias?", "Quem é o José Dias?"],
+    ["Como Escobar morreu?", "como escobar morreu", "Como o Escobar morreu?", "Escobar morreu como?"],
+    ["Por que Bentinho foi para o seminário?", "por que bentinho foi para o seminario",
+     "Por que o Bentinho foi para o seminário?", "Bentinho foi para o seminário por quê?"],
+    ["O que são os olhos de ressaca?", "o que sao os olhos de ressaca", "O que são olhos de ressaca?",
+     "Os olhos de ressaca, o que são?"],
+]
+
+
+def run(agent, queries):
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        state = agent.invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += "answer_cache" in state
+    return latencies, hits
+
+
+def llm_calls():
+    usage = telemetry.snapshot()["usage"]
+    return sum(usage.get(stage, {}).get("calls", 0) for stage in ("hyde", "llm"))
+
+
+def report(label, latencies, hits, calls):
+    print(
+        f"{label:<14} n={len(latencies):<4} p50={statistics.median(latencies):8.1f} ms  "
+        f"média={statistics.mean(latencies):8.1f} ms  acertos={hits:<4} chamadas ao LLM={calls}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--rounds", type=int, default=2, help="Vezes que cada redação é perguntada.")
+    parser.add_argument("--hyde-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    agent_module.USE_THRESHOLD = False
+    telemetry.enabled = True
+    queries = [query for group in QUESTION_GROUPS for query in group] * args.rounds
+    random.Random(0).shuffle(queries)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        doc_path = Path(workdir) / DOC_PATH.name
+        shutil.copy(DOC_PATH, doc_path)
+        agent = Agent(
+            doc_path=str(doc_path), embedding_client=HashedNgramOpenAI(),
+            answer_cache=AnswerCache(path=os.path.join(workdir, "answer_cache.sqlite"),
+                                     similarity_threshold=args.threshold),
+        )
+        agent.context_generator = ContextGenerator(doc_source=str(doc_path), client=FakeChatOpenAI())
+        agent.hyde_rag = fake_chat_model(args.hyde_latency, lambda messages: f"Hipótese: {messages[-1].content[:60]}")
+        agent.llm_with_tools = fake_chat_model(args.llm_latency)
+        agent.search_text("aquecimento")  # gera contextos e índice antes de medir
+
+        print(f"{len(queries)} perguntas ({len(QUESTION_GROUPS)} assuntos), limiar={args.threshold}")
+        agent_module.USE_ANSWER_CACHE = False
+        telemetry.reset()
+        latencies, hits = run(agent, queries)
+        report("sem cache", latencies, hits, llm_calls())
+
+        agent_module.USE_ANSWER_CACHE = True
+        telemetry.reset()
+        latencies, hits = run(agent, queries)
+        report("com cache", latencies, hits, llm_calls())
+        print(f"  estatísticas do cache: {agent.answer_cache.stats()}")
+
+        # Documento alterado: o índice é refeito e as respostas antigas deixam de valer.
+        with open(doc_path, "a", encoding="utf-8") as file:
+            file.write("\n\nParágrafo acrescentado para mudar o documento.\n")
+        telemetry.reset()
+        latencies, hits = run(agent, [group[0] for group in QUESTION_GROUPS])
+        report("após mudança", latencies, hits, llm_calls())
+        assert hits == 0, "respostas de um índice anterior não podem ser reaproveitadas"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+CollectionManager com muitos livros sintéticos (LLM e embeddings falsos): tempo de ingestão
+de uma pasta por coleção, reingestão sem mudanças, abertura sob demanda com descarte LRU
+sob um limite de memória e latência da busca com e sem filtro por documento.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_collections --collections 10 --books 20 --budget-mb 32
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.collection_manager import CollectionManager
+
+from ._stubs import FakeChatOpenAI, FakeOpenAI
+from .bench_ingest_memory import write_synthetic_document
+
+QUERIES = [
+    "Capitu e os olhos de ressaca",
+    "Escobar no seminário",
+    "José Dias e os superlativos",
+]
+
+
+def timed(fn, repeat):
+    fn()  # aquecimento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collections", type=int, default=10)
+    parser.add_argument("--books", type=int, default=20, help="Livros por coleção.")
+    parser.add_argument("--book-kb", type=int, default=64)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--budget-mb", type=float, default=32.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        manager = CollectionManager(
+            root=os.path.join(workdir, "collections"), memory_budget_mb=args.budget_mb,
+            embedding_client=FakeOpenAI(dim=args.dim), context_client=FakeChatOpenAI(),
+        )
+        names = [f"colecao_{i:03d}" for i in range(args.collections)]
+        start = time.perf_counter()
+        chunks = 0
+        for c, name in enumerate(names):
+            books_dir = Path(workdir) / "livros" / name
+            books_dir.mkdir(parents=True)
+            for b in range(args.books):
+                write_synthetic_document(books_dir / f"livro_{b:03d}.txt", args.book_kb / 1024, seed=c * 1000 + b)
+            chunks += manager.ingest_directory(name, books_dir)
+        print(f"{args.collections} coleções x {args.books} livros: {chunks} chunks em {time.perf_counter() - start:.1f} s")
+
+        start = time.perf_counter()
+        for name in names:
+            manager.ingest_directory(name, Path(workdir) / "livros" / name)
+        print(f"reingestão sem mudanças: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        manager.search(QUERIES[0], k=5)
+        print(
+            f"busca em todas as coleções: {len(manager.open_collections())} abertas, "
+            f"{manager.memory_used() / 2**20:.1f} MiB estimados (limite {args.budget_mb:.1f} MiB), "
+            f"{manager.evictions} descartes LRU"
+        )
+
+        hot = names[-1]
+        book = manager.documents(hot)
+        one_book = [next(iter(book))]
+        print(f"latência por query (coleção '{hot}' aberta):")
+        for label, fn in [
+            ("coleção inteira", lambda: [manager.search(q, k=5, collections=[hot], similarity_threshold=-1.0) for q in QUERIES]),
+            ("um livro", lambda: [
+                manager.search(q, k=5, collections=[hot], documents=one_book, similarity_threshold=-1.0) for q in QUERIES
+            ]),
+            ("todas as coleções", lambda: [manager.search(q, k=5, similarity_threshold=-1.0) for q in QUERIES]),
+        ]:
+            print(f"  {label:<18} {timed(fn, args.repeat) / len(QUERIES):8.2f} ms")
+        results = manager.search(QUERIES[0], k=5, collections=[hot], documents=one_book, similarity_threshold=-1.0)
+        assert all(result["document"] == one_book[0] for result in results)
+        print(f"descartes LRU no total: {manager.evictions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Vazão de ContextGenerator.generate_contexts em função da concorrência, com um
+cliente de LLM local de latência configurável (e rate limits opcionais).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_context_generation --latency 0.05 --concurrency 1,4,16
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import src.document_processor as document_processor
+from src.document_processor import ContextGenerator
+
+from ._stubs import FakeChatOpenAI
+
+DOC_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "Dom_Casmurro.txt"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doc", default=str(DOC_PATH))
+    parser.add_argument("--latency", type=float, default=0.02, help="Latência simulada por chamada (s).")
+    parser.add_argument("--concurrency", default="1,2,4,8,16")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="Fração das chamadas que falham com RateLimitError.")
+    args = parser.parse_args()
+
+    # Backoff curto: o objetivo aqui é medir a vazão, não esperar o rate limit real.
+    document_processor.CONTEXT_RETRY_BASE_DELAY = 0.01
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        baseline = None
+        for workers in (int(c) for c in args.concurrency.split(",")):
+            client = FakeChatOpenAI(latency=args.latency, rate_limit_rate=args.rate_limit_rate)
+            generator = ContextGenerator(doc_source=args.doc, client=client, max_workers=workers)
+            start = time.perf_counter()
+            json_path = generator.generate_contexts()
+            elapsed = time.perf_counter() - start
+            os.remove(json_path)
+
+            completions = client.chat.completions
+            chunks = completions.calls - completions.rate_limited
+            baseline = baseline or chunks / elapsed
+            print(
+                f"concorrência={workers:>3}  {chunks} chunks em {elapsed:6.2f} s  "
+                f"({chunks / elapsed:7.1f} chunks/s, {chunks / elapsed / baseline:5.1f}x)  "
+                f"rate limits={completions.rate_limited}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Tokens do contexto enviado ao LLM antes e depois do ContextPacker nas perguntas rotuladas
+de Dom Casmurro (benchmarks/data/dom_casmurro_questions.json), com embeddings locais
+determinísticos. "Antes" é o formato antigo (uma mensagem por resultado, chunk + contexto);
+"depois" une os chunks vizinhos, que se repetem pela sobreposição de 50%, e respeita o
+orçamento de tokens. Também confere se a evidência de cada pergunta, quando recuperada,
+continua no contexto empacotado.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_context_packing --k 5,10 --budget 0,1000,3000
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+from src.context_packer import ContextPacker
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import HashedNgramOpenAI
+from .eval_retrieval import QUESTIONS_PATH, load_corpus, normalize_space, parse_list, BUNDLED_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", default="5,10")
+    parser.add_argument("--budget", default="0,1000,3000", help="0 = sem orçamento (só a união dos vizinhos).")
+    parser.add_argument("--hyde", type=int, default=1, help="Busca com a hipótese do conjunto de perguntas.")
+    args = parser.parse_args()
+
+    with open(QUESTIONS_PATH, "r", encoding="utf-8") as file:
+        questions = json.load(file)
+    entries, _ = load_corpus(BUNDLED_CHUNK_SIZE, True)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db = SimpleVectorDB(name="bench_packing", client=HashedNgramOpenAI(), data_dir=workdir)
+        db.load_data(entries)
+        queries = [question["hyde"] if args.hyde else question["question"] for question in questions]
+        evidences = [normalize_space(question["evidence"]) for question in questions]
+
+        print(f"{len(questions)} perguntas, CHUNK_SIZE={BUNDLED_CHUNK_SIZE}")
+        for k in parse_list(args.k, int):
+            results = db.search_batch(queries, k=k, similarity_threshold=0.0)
+            for budget in parse_list(args.budget, int):
+                packer = ContextPacker(token_budget=budget or float("inf"))
+                before, after, spans, timings = [], [], [], []
+                found = kept = 0
+                for hits, evidence in zip(results, evidences):
+                    start = time.perf_counter()
+                    blocks, stats = packer.pack(hits)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    before.append(stats["tokens_before"])
+                    after.append(stats["tokens_after"])
+                    spans.append(stats["spans"])
+                    if any(evidence in normalize_space(hit["chunk"]) for hit in hits):
+                        found += 1
+                        kept += any(evidence in normalize_space(block) for block in blocks)
+                saved = 1 - sum(after) / sum(before)
+                print(
+                    f"k={k:<3} orçamento={budget or '-':<5} tokens antes={statistics.mean(before):7.0f}  "
+                    f"depois={statistics.mean(after):7.0f}  economia={saved:6.1%}  "
+                    f"trechos/pergunta={statistics.mean(spans):4.1f}  "
+                    f"evidência mantida={kept}/{found}  empacotar p50={statistics.median(timings):5.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tempo de carga e RSS do índice: vector_db.pkl (listas de floats) vs. formato
+binário (embeddings.npy via memmap + metadata.json + header.json).
+Requer Linux (lê VmHWM de /proc/self/status).
+Cada carga roda em um subprocesso novo para que o pico de RSS seja isolado.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_db_load --chunks 20000 --dim 1536
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+LOADER = """
+import json, os, sys, time
+from src.simple_vectorDB import SimpleVectorDB
+from benchmarks._stubs import FakeOpenAI
+
+fmt = sys.argv[1]
+db = SimpleVectorDB(name="bench_load", client=FakeOpenAI())
+start = time.perf_counter()
+if fmt == "pickle":
+    db._load_legacy_pickle()
+else:
+    db.load_db()
+load_ms = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+db.embeddings @ db.embeddings[0]
+first_scan_ms = (time.perf_counter() - start) * 1000
+# VmHWM é o pico de RSS do próprio processo (ru_maxrss herdaria o pico do processo pai).
+with open("/proc/self/status") as status:
+    hwm_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+print(json.dumps({"load_ms": load_ms, "first_scan_ms": first_scan_ms, "max_rss_mb": hwm_kb / 1024}))
+"""
+
+
+def write_legacy_pickle(path, chunks, dim):
+    vectors = np.random.default_rng(0).standard_normal((chunks, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    data = {
+        "embeddings": vectors.tolist(),
+        "metadata": [{"chunk_content": f"chunk {i}", "context": "", "original_index": i} for i in range(chunks)],
+        "query_cache": "{}",
+        "total_tokens_used": 0,
+        "total_cost": 0.0,
+    }
+    with open(path, "wb") as file:
+        pickle.dump(data, file)
+
+
+def run_loader(workdir, fmt):
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), OPENAI_API_KEY="sk-benchmark")
+    out = subprocess.run(
+        [sys.executable, "-c", LOADER, fmt], cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_dir = Path(workdir) / "data" / "bench_load"
+        db_dir.mkdir(parents=True)
+        write_legacy_pickle(db_dir / "vector_db.pkl", args.chunks, args.dim)
+
+        # Migração única pkl -> binário (mesmo caminho usado por load_db).
+        subprocess.run(
+            [sys.executable, "-m", "src.simple_vectorDB", "bench_load"],
+            cwd=workdir, env=dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), OPENAI_API_KEY="sk-benchmark"),
+            check=True, capture_output=True,
+        )
+
+        print(f"chunks={args.chunks} dim={args.dim}")
+        for fmt in ("pickle", "binary"):
+            stats = run_loader(workdir, fmt)
+            print(
+                f"{fmt:<7} carga={stats['load_ms']:9.2f} ms  primeira varredura={stats['first_scan_ms']:8.2f} ms  "
+                f"pico RSS={stats['max_rss_mb']:8.1f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
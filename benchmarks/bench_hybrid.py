@@ -0,0 +1,126 @@
+"""
+Índice lexical BM25 da busca híbrida no corpus de Dom Casmurro replicado N vezes:
+tempo de construção (tokenização + listas invertidas), salvamento/carga, atualização
+incremental e latência por query do BM25, da busca densa e da busca híbrida (RRF).
+Os vetores densos são sintéticos, então a latência não depende da API.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_hybrid --replicas 100
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from src.document_processor import chunk_hash
+from src.lexical_index import LexicalIndex
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import FakeOpenAI
+
+QUERIES = [
+    "Capitú",
+    "Escobar",
+    "olhos de cigana oblíqua e dissimulada",
+    "seminário e a promessa de Dona Glória",
+    "José Dias e os superlativos",
+]
+
+
+def replicate(chunks, replicas):
+    """Metadados de `replicas` cópias do corpus; cada cópia recebe chaves próprias."""
+    metadata = []
+    for copy in range(replicas):
+        for item in chunks:
+            metadata.append({
+                "chunk_content": item["chunk"],
+                "context": item["context"],
+                "original_index": len(metadata),
+                "embedding_key": chunk_hash(f"{copy}:{item['chunk']}\n{item['context']}"),
+            })
+    return metadata
+
+
+def timed(fn, repeat):
+    fn()  # aquecimento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", default="src/data/Dom_Casmurro_chunks_with_context_adj.json")
+    parser.add_argument("--replicas", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.json, "r", encoding="utf-8") as file:
+        chunks = json.load(file)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        metadata = replicate(chunks, args.replicas)
+        keys = [meta["embedding_key"] for meta in metadata]
+        texts = [f"{meta['chunk_content']}\n{meta['context']}" for meta in metadata]
+        print(f"{len(chunks)} chunks x {args.replicas} = {len(metadata)} documentos")
+
+        lexical = LexicalIndex()
+        start = time.perf_counter()
+        lexical.update(keys, texts)
+        tokenize_s = time.perf_counter() - start
+        start = time.perf_counter()
+        lexical.search(QUERIES[0], args.k)  # constrói as listas invertidas
+        postings_s = time.perf_counter() - start
+        print(f"construção: tokenização {tokenize_s:.2f} s, listas invertidas {postings_s:.2f} s")
+
+        path = os.path.join(workdir, "lexical_index.npz")
+        start = time.perf_counter()
+        lexical.save(path)
+        save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        lexical = LexicalIndex.load(path)
+        load_s = time.perf_counter() - start
+        print(f"salvar {save_s:.2f} s, carregar {load_s:.2f} s ({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+        # Atualização incremental: 1% dos documentos alterados.
+        changed = list(range(0, len(keys), 100))
+        new_keys = list(keys)
+        for idx in changed:
+            new_keys[idx] = chunk_hash(f"alterado:{idx}")
+        start = time.perf_counter()
+        tokenized = lexical.update(new_keys, texts)
+        update_s = time.perf_counter() - start
+        print(f"atualização incremental: {tokenized} documentos tokenizados em {update_s:.2f} s")
+
+        db = SimpleVectorDB(name="bench_hybrid", client=FakeOpenAI(dim=args.dim))
+        vectors = np.random.default_rng(0).standard_normal((len(metadata), args.dim), dtype=np.float32)
+        db._reset_embeddings(len(vectors), args.dim)
+        db._append_embeddings(vectors)
+        db.metadata = metadata
+        db.lexical_index = lexical
+        db._lexical_stale = True
+        db.search_batch(QUERIES, k=args.k)  # preenche o cache de embeddings
+
+        print(f"latência por query (k={args.k}):")
+        for label, fn in [
+            ("bm25", lambda: [db._get_lexical_index().search(query, args.k) for query in QUERIES]),
+            ("densa", lambda: [db.search(query, k=args.k, similarity_threshold=-1.0) for query in QUERIES]),
+            ("híbrida (RRF)", lambda: [
+                db.search(query, k=args.k, similarity_threshold=-1.0, use_hybrid=True) for query in QUERIES
+            ]),
+        ]:
+            print(f"  {label:<15} {timed(fn, args.repeat) / len(QUERIES):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
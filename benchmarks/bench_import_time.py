@@ -0,0 +1,68 @@
+"""
+Tempo de import (python -X importtime, processo novo a cada medição) dos pontos de
+entrada do projeto, e quais dependências pesadas cada um carrega. `src.search` não pode
+carregar as dependências de LLM, rerank e notebook; o script sai com código 1 se carregar
+alguma delas ou se a mediana do seu import passar de --max-ms.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_import_time --runs 5 --max-ms 400
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODULES = ["src.search", "src.simple_vectorDB", "src.collection_manager", "src.agent"]
+HEAVY = ["openai", "cohere", "tqdm", "tiktoken", "langchain_core", "langchain_openai", "langchain_text_splitters",
+         "langgraph", "IPython", "sentence_transformers"]
+# Dependências que o ponto de entrada só de busca não pode importar.
+FORBIDDEN = {"src.search": HEAVY}
+
+
+def import_ms(module):
+    """Tempo cumulativo (ms) do import de `module` segundo -X importtime."""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    match = re.search(rf"^import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", output, re.MULTILINE)
+    return int(match.group(1)) / 1000
+
+
+def loaded_heavy(module):
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+    return output.split(",") if output else []
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=400.0, help="Limite da mediana do import de src.search.")
+    args = parser.parse_args()
+
+    failures = []
+    for module in MODULES:
+        timings = [import_ms(module) for _ in range(args.runs)]
+        heavy = loaded_heavy(module)
+        median = statistics.median(timings)
+        print(f"{module:<24} mediana={median:8.1f} ms  mín={min(timings):8.1f} ms  pesadas: {', '.join(heavy) or '-'}")
+        forbidden = [name for name in heavy if name in FORBIDDEN.get(module, [])]
+        if forbidden:
+            failures.append(f"{module} importou {', '.join(forbidden)}")
+        if module == "src.search" and median > args.max_ms:
+            failures.append(f"{module} levou {median:.1f} ms (limite {args.max_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"REGRESSÃO: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Pico de RSS da ingestão (chunking -> contextos de ponte -> embeddings -> índice em disco)
+em documentos sintéticos de tamanhos crescentes, com LLM e embeddings falsos.
+Compara a ingestão em streaming (ContextGenerator.iter_contexts + SimpleVectorDB.ingest_stream)
+com o caminho em memória (generate_contexts + json.load + load_data).
+Requer Linux (lê VmHWM de /proc/self/status). Cada ingestão roda em um subprocesso novo.
+
+Sai com código 1 se o pico de RSS do streaming crescer mais que --max-growth-mb entre o
+menor e o maior documento.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_ingest_memory --sizes-mb 2,8,32 --in-memory-max-mb 8
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_TEXT = PROJECT_ROOT / "src" / "data" / "Dom_Casmurro.txt"
+
+INGEST = """
+import json, sys, time
+from src.document_processor import ContextGenerator
+from src.simple_vectorDB import SimpleVectorDB
+from benchmarks._stubs import FakeChatOpenAI, FakeOpenAI
+
+mode, doc_path, dim = sys.argv[1], sys.argv[2], int(sys.argv[3])
+generator = ContextGenerator(doc_path, client=FakeChatOpenAI())
+db = SimpleVectorDB(name="bench_ingest", client=FakeOpenAI(dim=dim))
+start = time.perf_counter()
+if mode == "streaming":
+    db.ingest_stream(generator.iter_contexts())
+else:
+    with open(generator.generate_contexts(), "r", encoding="utf-8") as file:
+        db.load_data(json.load(file))
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    hwm_kb = next(int(line.split()[1]) for line in status if line.startswith("VmHWM:"))
+print(json.dumps({"seconds": elapsed, "chunks": db.reused_embeddings + db.embedded_chunks, "max_rss_mb": hwm_kb / 1024}))
+"""
+
+
+def write_synthetic_document(path, size_mb, seed=0):
+    """Texto com o vocabulário de Dom Casmurro em ordem aleatória: chunks distintos entre si."""
+    with open(SOURCE_TEXT, "r", encoding="utf-8") as file:
+        vocabulary = np.array(sorted(set(re.findall(r"\w+[,.;!?]?", file.read()))))
+    rng = np.random.default_rng(seed)
+    target = size_mb * 2**20
+    written = 0
+    with open(path, "w", encoding="utf-8") as file:
+        while written < target:
+            paragraph = " ".join(rng.choice(vocabulary, size=2000)) + "\n\n"
+            file.write(paragraph)
+            written += len(paragraph.encode("utf-8"))
+
+
+def run_ingest(workdir, mode, doc_path, dim):
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), OPENAI_API_KEY="sk-benchmark")
+    out = subprocess.run(
+        [sys.executable, "-c", INGEST, mode, str(doc_path), str(dim)],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes-mb", default="2,8,32")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--in-memory-max-mb", type=int, default=8,
+                        help="Não roda o caminho em memória acima deste tamanho de documento.")
+    parser.add_argument("--max-growth-mb", type=float, default=64.0,
+                        help="Crescimento máximo aceito do pico de RSS do streaming entre o menor e o maior documento.")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes_mb.split(",")]
+    streaming_rss = []
+    for size_mb in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            doc_path = Path(workdir) / f"sintetico_{size_mb}mb.txt"
+            write_synthetic_document(doc_path, size_mb)
+            modes = ["streaming"] + (["em memória"] if size_mb <= args.in_memory_max_mb else [])
+            for mode in modes:
+                # Cada modo parte de um diretório de dados vazio.
+                run_dir = Path(workdir) / mode.replace(" ", "_")
+                run_dir.mkdir()
+                result = run_ingest(run_dir, mode, doc_path, args.dim)
+                if mode == "streaming":
+                    streaming_rss.append(result["max_rss_mb"])
+                print(
+                    f"{size_mb:>5} MB  {mode:<11} {result['chunks']:>7} chunks  "
+                    f"{result['seconds']:7.1f} s  pico RSS={result['max_rss_mb']:8.1f} MB"
+                )
+
+    growth = streaming_rss[-1] - streaming_rss[0]
+    print(f"crescimento do pico de RSS do streaming ({sizes[0]} -> {sizes[-1]} MB): {growth:.1f} MB")
+    if growth > args.max_growth_mb:
+        print(f"FALHA: crescimento acima de {args.max_growth_mb:.1f} MB")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Memória e perda de recall dos índices quantizados (int8 e binário) comparados à busca
+exata em float32. Os vetores float ficam em um .npy aberto com memmap, como no índice
+salvo em disco: os índices quantizados só leem dele as linhas dos candidatos.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_quantization --size 200000 --dim 384
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from src.vector_index import BinaryIndex, ExactIndex, Int8Index
+
+from .bench_ann import clustered_vectors, recall_at_k, run_queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    queries = clustered_vectors(rng, args.queries, args.dim, centers)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "embeddings.npy")
+        np.save(path, clustered_vectors(rng, args.size, args.dim, centers))
+        vectors = np.load(path, mmap_mode="r")
+
+        exact = ExactIndex()
+        exact.build(vectors)
+        exact_ms, exact_results = run_queries(exact, queries, args.k)
+        float_mb = vectors.size * 4 / 2**20
+        print(f"n={args.size} dim={args.dim} k={args.k}")
+        print(f"exact   memória={float_mb:8.1f} MB  recall@{args.k}=1.000  latência={exact_ms:7.2f} ms")
+
+        for index in (Int8Index(), BinaryIndex()):
+            index.build(vectors)
+            index_ms, index_results = run_queries(index, queries, args.k)
+            print(
+                f"{index.name:<7} memória={index.nbytes / 2**20:8.1f} MB ({float_mb * 2**20 / index.nbytes:4.0f}x menor)  "
+                f"recall@{args.k}={recall_at_k(index_results, exact_results, args.k):.3f}  "
+                f"latência={index_ms:7.2f} ms  (re-score de {index.rescore_factor * args.k} candidatos)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latência de SimpleVectorDB.search com rerank: Cohere (cliente falso com a latência de
+rede configurável, antes recriado a cada busca e agora reutilizado) vs. o BM25 em processo.
+Usa os chunks reais de data/Dom_Casmurro_chunks_with_context_adj.json quando presentes.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_rerank --latency 0.15 --k 10
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+from src.rerankers import BM25Reranker, CohereReranker
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import FakeOpenAI
+
+QUERIES = [
+    "Quem é Capitu?",
+    "O que Escobar representa para Bentinho?",
+    "Por que Bentinho foi para o seminário?",
+    "Olhos de ressaca",
+    "Qual a relação entre José Dias e a família de Bentinho?",
+]
+
+
+class FakeCohereClient:
+    """Devolve os documentos na ordem inversa após `latency` segundos, como um rerank remoto."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def rerank(self, query, documents, top_n, model):
+        time.sleep(self.latency)
+        order = list(reversed(range(len(documents))))[:top_n]
+        return SimpleNamespace(results=[
+            SimpleNamespace(index=i, relevance_score=1.0 / (rank + 1)) for rank, i in enumerate(order)
+        ])
+
+
+def load_chunks(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    return [{"chunk": f"chunk sintético {i} sobre Capitu e Bentinho", "context": ""} for i in range(500)]
+
+
+def timed(fn, repeat):
+    fn()  # aquecimento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", default="data/Dom_Casmurro_chunks_with_context_adj.json")
+    parser.add_argument("--latency", type=float, default=0.15, help="Latência simulada do rerank da Cohere (s).")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunks = load_chunks(os.path.abspath(args.json))
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        db = SimpleVectorDB(name="bench_rerank", client=FakeOpenAI(dim=256))
+        db.load_data(chunks)
+
+        def search_all():
+            for query in QUERIES:
+                db.search(query, k=args.k, similarity_threshold=-1.0, use_rerank=True, rerank_top_n=args.k)
+
+        db.search(QUERIES[0], k=args.k, similarity_threshold=-1.0)  # preenche o cache de embeddings
+        print(f"{len(chunks)} chunks, {len(QUERIES)} queries, k={args.k}")
+        for label, reranker in [
+            (f"cohere (latência simulada {args.latency * 1000:.0f} ms)", CohereReranker(client=FakeCohereClient(args.latency))),
+            ("bm25 (em processo)", BM25Reranker()),
+        ]:
+            db.reranker = reranker
+            ms = timed(search_all, args.repeat) / len(QUERIES)
+            print(f"{label:<40} {ms:9.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Telemetria (src/telemetry.py) com clientes falsos: custo de uma span com PROFILING desligado
+e ligado, latência de SimpleVectorDB.search nos dois modos e o relatório por etapa (tempo,
+tokens, custo e acertos de cache) de algumas perguntas ao Agent, em JSON e no formato do Prometheus.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_telemetry --queries 20
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import src.agent as agent_module
+from src.agent import Agent
+from src.document_processor import ContextGenerator
+from src.telemetry import telemetry
+
+from ._stubs import FakeChatOpenAI, FakeOpenAI, fake_chat_model
+
+DOC_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "Dom_Casmurro.txt"
+
+
+def span_cost_ns(iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with telemetry.span("bench"):
+            pass
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def search_latency_ms(vector_db, queries, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            vector_db.search(query, k=5, similarity_threshold=-1.0)
+        timings.append((time.perf_counter() - start) * 1000 / len(queries))
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    agent_module.USE_THRESHOLD = False
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        agent = Agent(doc_path=str(DOC_PATH), embedding_client=FakeOpenAI())
+        agent.context_generator = ContextGenerator(doc_source=str(DOC_PATH), client=FakeChatOpenAI())
+        agent.hyde_rag = fake_chat_model(0.0, lambda messages: f"Hipótese: {messages[-1].content[:60]}")
+        agent.llm_with_tools = fake_chat_model(0.0)
+
+        telemetry.enabled = True
+        agent.search_text("aquecimento")  # ingestão: contextos, embeddings e índice
+        queries = [f"Pergunta {i} sobre Capitu?" for i in range(args.queries)]
+        vector_db = agent._get_vector_db()
+        vector_db.search_batch(queries)  # preenche o cache de embeddings
+
+        for enabled in (False, True):
+            telemetry.enabled = enabled
+            label = "ligada" if enabled else "desligada"
+            print(
+                f"telemetria {label:<9}: span {span_cost_ns(args.iterations):6.0f} ns, "
+                f"search {search_latency_ms(vector_db, queries, args.repeat):6.3f} ms/query"
+            )
+
+        telemetry.enabled = True
+        telemetry.reset()
+        agent.run_queries(queries)
+        print(telemetry.to_json())
+        print(telemetry.to_prometheus())
+
+
+if __name__ == "__main__":
+    main()
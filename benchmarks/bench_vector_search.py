@@ -0,0 +1,83 @@
+"""
+Microbenchmark de SimpleVectorDB.search em corpora sintéticos.
+Compara a busca original (lista de arrays -> np.array float64 + argsort completo +
+filtro em loop Python) com a matriz float32 normalizada + argpartition.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_vector_search --sizes 10000,100000,1000000 --dim 256
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import FakeOpenAI
+
+QUERY = "benchmark"
+
+
+def legacy_search(embeddings, query_embedding, k, similarity_threshold):
+    similarities = np.dot(np.array(embeddings), query_embedding)
+    effective_k = min(k, len(similarities))
+    top_indices = np.argsort(similarities)[::-1][:effective_k]
+    return [idx for idx in top_indices if similarities[idx] >= similarity_threshold]
+
+
+def build_db(vectors):
+    db = SimpleVectorDB(name="bench_synthetic", client=FakeOpenAI(dim=vectors.shape[1]))
+    db._reset_embeddings(len(vectors), vectors.shape[1])
+    db._append_embeddings(vectors)
+    db.metadata = [
+        {"chunk_content": f"chunk {i}", "context": "", "original_index": i} for i in range(len(vectors))
+    ]
+    return db
+
+
+def timed(fn, repeat):
+    fn()  # aquecimento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy-max", type=int, default=100000,
+                        help="Não roda o caminho original acima deste tamanho (usa ~3x mais memória).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        rng = np.random.default_rng(0)
+        print(f"dim={args.dim} k={args.k}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+            db = build_db(vectors)
+            db.search(QUERY, k=args.k, similarity_threshold=-1.0)  # preenche o cache de embeddings
+            new_ms = timed(lambda: db.search(QUERY, k=args.k, similarity_threshold=-1.0), args.repeat)
+
+            legacy = "-"
+            if size <= args.legacy_max:
+                legacy_embeddings = [np.array(v, dtype=np.float64) for v in vectors]
+                query_embedding = db._embed_texts([QUERY])[0].astype(np.float64)
+                legacy_ms = timed(lambda: legacy_search(legacy_embeddings, query_embedding, args.k, -1.0), args.repeat)
+                legacy = f"{legacy_ms:9.2f} ms ({legacy_ms / new_ms:5.1f}x)"
+                del legacy_embeddings
+            print(f"n={size:>8}  novo={new_ms:9.2f} ms  original={legacy}")
+            del db, vectors
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Avaliação offline e reproduzível da recuperação em Dom Casmurro: um conjunto de perguntas
+rotuladas (benchmarks/data/dom_casmurro_questions.json) é buscado com embeddings locais
+determinísticos (n-gramas com hashing, sem API) em cada combinação de configurações pedida.
+Cada pergunta traz um trecho literal do livro como evidência: os chunks relevantes são os
+que contêm esse trecho, então os rótulos valem para qualquer CHUNK_SIZE.
+
+Por configuração: recall@k, MRR, fração de perguntas com resultado, latência por etapa
+(telemetria), memória do índice, chamadas de embeddings feitas e evitadas pelo cache.
+Com CHUNK_SIZE igual ao do JSON de contextos do repositório os contextos de ponte reais
+são usados; nos demais tamanhos os chunks são indexados sem contexto. O HyDE usa a
+hipótese escrita no conjunto de perguntas no lugar da chamada ao LLM.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.eval_retrieval --hyde 0,1 --rerank 0,1 --output resultados.json
+    python -m benchmarks.eval_retrieval --chunk-size 250,500 --threshold 0,0.2 --baseline resultados.json
+
+Com --baseline, compara com um JSON anterior (mesmas configurações) e sai com código 1 se
+recall@k ou MRR cair mais que --max-drop.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.configs import CHUNK_SIZE, USE_HYDE, USE_RERANK, USE_HYBRID, USE_THRESHOLD, SIMILARITY_THRESHOLD, INDEX_BACKEND
+from src.document_processor import DocumentProcessor
+from src.embedding_cache import EmbeddingCache
+from src.rerankers import create_reranker
+from src.simple_vectorDB import SimpleVectorDB
+from src.telemetry import telemetry
+
+from ._stubs import HashedNgramOpenAI
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DOC_PATH = PROJECT_ROOT / "src" / "data" / "Dom_Casmurro.txt"
+CONTEXTS_PATH = PROJECT_ROOT / "src" / "data" / "Dom_Casmurro_chunks_with_context_adj.json"
+QUESTIONS_PATH = Path(__file__).resolve().parent / "data" / "dom_casmurro_questions.json"
+# Tamanho de chunk com que o JSON de contextos do repositório foi gerado.
+BUNDLED_CHUNK_SIZE = 500
+
+
+def normalize_space(text):
+    return re.sub(r"\s+", " ", text)
+
+
+def parse_list(value, cast):
+    return [cast(item) for item in value.split(",")]
+
+
+def parse_bool(value):
+    return value.strip().lower() in ("1", "true", "sim", "yes")
+
+
+def load_corpus(chunk_size, use_contexts):
+    """Entradas {chunk, context} de Dom Casmurro e a origem dos contextos ("bundled" ou "none")."""
+    if use_contexts and chunk_size == BUNDLED_CHUNK_SIZE and CONTEXTS_PATH.exists():
+        with open(CONTEXTS_PATH, "r", encoding="utf-8") as file:
+            return json.load(file), "bundled"
+    chunks, _ = DocumentProcessor(str(DOC_PATH), chunk_size=chunk_size).get_chunks()
+    return [{"chunk": chunk, "context": ""} for chunk in chunks], "none"
+
+
+def relevant_rows(entries, questions):
+    """Para cada pergunta, as linhas cujos chunks contêm a evidência (espaços normalizados)."""
+    chunks = [normalize_space(entry["chunk"]) for entry in entries]
+    relevant = []
+    for question in questions:
+        evidence = normalize_space(question["evidence"])
+        rows = {row for row, chunk in enumerate(chunks) if evidence in chunk}
+        if not rows:
+            print(f"AVISO: evidência de {question['id']} não encontrada em nenhum chunk.")
+        relevant.append(rows)
+    return relevant
+
+
+def retrieval_metrics(results, relevant, ks):
+    """recall@k (alguma linha relevante entre as k primeiras), MRR e fração de perguntas respondidas."""
+    recalls = {k: 0 for k in ks}
+    reciprocal_ranks = []
+    answered = 0
+    for hits, rows in zip(results, relevant):
+        ranked = [hit["original_index"] for hit in hits]
+        answered += bool(ranked)
+        first = next((rank for rank, row in enumerate(ranked, start=1) if row in rows), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+        for k in ks:
+            recalls[k] += first is not None and first <= k
+    n = len(results)
+    return {
+        **{f"recall@{k}": recalls[k] / n for k in ks},
+        "mrr": sum(reciprocal_ranks) / n,
+        "answered": answered / n,
+    }
+
+
+def evaluate(config, questions, ks, corpus_cache, workdir, embedding_cache, dim, repeat):
+    key = (config["chunk_size"], config["contexts"])
+    if key not in corpus_cache:
+        entries, contexts = load_corpus(*key)
+        corpus_cache[key] = (entries, contexts, relevant_rows(entries, questions))
+    entries, contexts, relevant = corpus_cache[key]
+
+    telemetry.reset()
+    client = HashedNgramOpenAI(dim=dim)
+    db = SimpleVectorDB(
+        name=f"eval_{config['chunk_size']}_{contexts}", client=client, embedding_cache=embedding_cache,
+        index_backend=config["index_backend"], data_dir=workdir,
+    )
+    if config["rerank"]:
+        db.reranker = create_reranker(config["rerank_backend"])
+    start = time.perf_counter()
+    db.load_data(entries)
+    ingest_s = time.perf_counter() - start
+    ingest_requests = client.embeddings.calls
+
+    queries = [question["hyde"] if config["hyde"] else question["question"] for question in questions]
+    search = dict(
+        k=max(ks), similarity_threshold=config["threshold"], use_rerank=config["rerank"],
+        rerank_top_n=max(ks), use_hybrid=config["hybrid"],
+    )
+    latencies = []
+    for _ in range(repeat):
+        results = []
+        for query in queries:
+            t0 = time.perf_counter()
+            results.append(db.search(query, **search))
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    snapshot = telemetry.snapshot()
+    cache = snapshot["caches"].get("embedding", {"hits": 0, "misses": 0})
+    index_bytes = db.embeddings.nbytes
+    if config["hybrid"] and os.path.exists(db.lexical_path):
+        index_bytes += os.path.getsize(db.lexical_path)
+    return {
+        "config": config,
+        "contexts_used": contexts,
+        "chunks": len(entries),
+        "metrics": retrieval_metrics(results, relevant, ks),
+        "latency_ms": {
+            "search_p50": statistics.median(latencies),
+            "search_p95": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+            "stages": {stage: stats["mean_s"] * 1000 for stage, stats in snapshot["stages"].items()},
+            "ingest": ingest_s * 1000,
+        },
+        "memory_mb": {
+            "index": index_bytes / 2**20,
+            # Pico do processo inteiro até esta configuração (monotônico ao longo da varredura).
+            "process_max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "api": {
+            "embedding_requests": client.embeddings.calls,
+            "embedding_requests_ingest": ingest_requests,
+            "chunk_embeddings_reused": db.reused_embeddings,
+            "embeddings_from_cache": cache["hits"],
+            "embeddings_generated": cache["misses"],
+            "llm_calls_hyde": len(queries) * repeat if config["hyde"] else 0,
+        },
+    }
+
+
+def print_run(run, ks):
+    config, metrics = run["config"], run["metrics"]
+    label = (
+        f"chunk={config['chunk_size']:<4} ctx={run['contexts_used']:<7} hyde={int(config['hyde'])} "
+        f"rerank={int(config['rerank'])} hybrid={int(config['hybrid'])} thr={config['threshold']:<5} "
+        f"idx={config['index_backend']:<6}"
+    )
+    recalls = " ".join(f"R@{k}={metrics[f'recall@{k}']:.3f}" for k in ks)
+    print(
+        f"{label} | {recalls} MRR={metrics['mrr']:.3f} resp={metrics['answered']:.2f} | "
+        f"p50={run['latency_ms']['search_p50']:.2f} ms | índice={run['memory_mb']['index']:.1f} MB | "
+        f"embeddings do cache={run['api']['embeddings_from_cache']}"
+    )
+
+
+def compare(runs, baseline_path, max_drop):
+    """Compara com um resultado anterior; retorna o número de regressões acima de `max_drop`."""
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = {json.dumps(run["config"], sort_keys=True): run for run in json.load(file)["runs"]}
+    regressions = 0
+    for run in runs:
+        previous = baseline.get(json.dumps(run["config"], sort_keys=True))
+        if previous is None:
+            continue
+        for metric, value in run["metrics"].items():
+            if metric not in previous["metrics"]:
+                continue
+            delta = value - previous["metrics"][metric]
+            if delta < -max_drop:
+                regressions += 1
+                print(f"REGRESSÃO {run['config']}: {metric} {previous['metrics'][metric]:.3f} -> {value:.3f}")
+    print(f"comparação com {baseline_path}: {regressions} regressões")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", default=str(CHUNK_SIZE), help="Lista separada por vírgulas.")
+    parser.add_argument("--hyde", default=str(int(USE_HYDE)))
+    parser.add_argument("--rerank", default=str(int(USE_RERANK)))
+    parser.add_argument("--rerank-backend", default="bm25", choices=["bm25", "cross-encoder"],
+                        help="Reranker offline usado quando --rerank=1.")
+    parser.add_argument("--hybrid", default=str(int(USE_HYBRID)))
+    parser.add_argument("--threshold", default=str(SIMILARITY_THRESHOLD if USE_THRESHOLD else -1.0))
+    parser.add_argument("--index-backend", default=INDEX_BACKEND)
+    parser.add_argument("--contexts", default="1", help="1 usa os contextos de ponte do repositório quando possível.")
+    parser.add_argument("--k", default="1,3,5,10")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3, help="Passadas pelas perguntas (latência).")
+    parser.add_argument("--questions", default=str(QUESTIONS_PATH))
+    parser.add_argument("--output", help="Grava os resultados em JSON.")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para detectar regressões.")
+    parser.add_argument("--max-drop", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as file:
+        questions = json.load(file)
+    ks = parse_list(args.k, int)
+    grid = itertools.product(
+        parse_list(args.chunk_size, int), parse_list(args.contexts, parse_bool), parse_list(args.hyde, parse_bool),
+        parse_list(args.rerank, parse_bool), parse_list(args.hybrid, parse_bool),
+        parse_list(args.threshold, float), parse_list(args.index_backend, str),
+    )
+    configs = [
+        {"chunk_size": chunk_size, "contexts": contexts, "hyde": hyde, "rerank": rerank,
+         "rerank_backend": args.rerank_backend if rerank else None, "hybrid": hybrid,
+         "threshold": threshold, "index_backend": index_backend}
+        for chunk_size, contexts, hyde, rerank, hybrid, threshold, index_backend in grid
+    ]
+
+    was_enabled = telemetry.enabled
+    telemetry.enabled = True
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # Um cache de embeddings para a varredura inteira: configurações com o mesmo corpus
+        # reaproveitam os vetores dos chunks (contado em "embeddings_from_cache").
+        embedding_cache = EmbeddingCache(path=os.path.join(workdir, "embedding_cache.sqlite"))
+        corpus_cache = {}
+        print(f"{len(questions)} perguntas, {len(configs)} configurações")
+        for config in configs:
+            run = evaluate(config, questions, ks, corpus_cache, workdir, embedding_cache, args.dim, args.repeat)
+            print_run(run, ks)
+            runs.append(run)
+        embedding_cache.close()
+    telemetry.enabled = was_enabled
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"questions": len(questions), "k": ks, "dim": args.dim, "runs": runs},
+                      file, ensure_ascii=False, indent=2)
+        print(f"resultados gravados em {args.output}")
+    if args.baseline and compare(runs, args.baseline, args.max_drop):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Teste de carga do Agent com clientes falsos: latência p50/p95 e QPS de run_query
+sequencial vs. arun_query com várias conversas simultâneas no mesmo event loop.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.load_agent_async --conversations 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import src.agent as agent_module
+from src.agent import Agent
+from src.document_processor import ContextGenerator
+
+from ._stubs import FakeChatOpenAI, FakeOpenAI, fake_chat_model
+
+DOC_PATH = Path(__file__).resolve().parent.parent / "src" / "data" / "Dom_Casmurro.txt"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, latencies, elapsed):
+    print(
+        f"{label:<24} n={len(latencies):<4} p50={percentile(latencies, 50) * 1000:8.1f} ms  "
+        f"p95={percentile(latencies, 95) * 1000:8.1f} ms  QPS={len(latencies) / elapsed:7.2f}"
+    )
+
+
+def run_sync(agent, queries):
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        t0 = time.perf_counter()
+        agent.invoke(query)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+async def run_async(agent, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def conversation(query):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await agent.arun_query(query)
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(query) for query in queries))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sync-conversations", type=int, default=10)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--hyde-latency", type=float, default=0.2)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    args = parser.parse_args()
+
+    # Sem o threshold toda conversa chega até a chamada final ao LLM.
+    agent_module.USE_THRESHOLD = False
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        agent = Agent(doc_path=str(DOC_PATH), embedding_client=FakeOpenAI())
+        agent.context_generator = ContextGenerator(doc_source=str(DOC_PATH), client=FakeChatOpenAI())
+        agent.hyde_rag = fake_chat_model(args.hyde_latency, lambda messages: f"Hipótese: {messages[-1].content[:60]}")
+        agent.llm_with_tools = fake_chat_model(args.llm_latency)
+        agent.search_text("aquecimento")  # gera contextos e índice antes de medir
+        agent.embedding_client.embeddings.latency = args.embed_latency
+
+        sync_queries = [f"Pergunta síncrona {i} sobre Capitu?" for i in range(args.sync_conversations)]
+        report("run_query (sequencial)", *run_sync(agent, sync_queries))
+
+        async_queries = [f"Pergunta assíncrona {i} sobre Capitu?" for i in range(args.conversations)]
+        latencies, elapsed = asyncio.run(run_async(agent, async_queries, args.concurrency))
+        report(f"arun_query (conc={args.concurrency})", latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
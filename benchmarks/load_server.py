@@ -0,0 +1,224 @@
+"""
+Teste de carga do servidor de busca pré-fork (src/server.py) com um backend de embeddings
+falso (latência de rede simulada por chamada) sobre um índice sintético em disco. Para
+cada número de workers: QPS, p50/p95, tamanho médio dos lotes do search_batch, aceleração
+em relação a 1 worker e a memória privada (USS) e proporcional (PSS) de cada worker
+comparadas ao tamanho da matriz de embeddings. A primeira linha roda 1 worker sem juntar
+buscas em lotes (--max-batch 1), como referência.
+
+O script sai com código 1 se, com workers e clientes cabendo nas CPUs da máquina, a
+aceleração ficar abaixo de --min-efficiency x workers, ou se a memória privada de um
+worker passar de --max-private-fraction do tamanho da matriz (com 2+ workers).
+
+Uso (na raiz do projeto):
+    python -m benchmarks.load_server --rows 200000 --dim 384 --workers 1,2,4 --duration 5
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from src.configs import SERVER_MAX_BATCH
+from src.embedding_cache import EmbeddingCache
+from src.search import open_index
+from src.server import serve
+from src.simple_vectorDB import SimpleVectorDB
+
+from ._stubs import FakeOpenAI
+
+INDEX_NAME = "bench_server"
+
+
+def build_index(workdir, rows, dim):
+    db = SimpleVectorDB(
+        name=INDEX_NAME, client=FakeOpenAI(dim=dim), data_dir=workdir,
+        embedding_cache=EmbeddingCache(path=os.path.join(workdir, "embedding_cache.sqlite")),
+    )
+    db._reset_embeddings(rows, dim)
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, 50_000):
+        db._append_embeddings(rng.standard_normal((min(50_000, rows - start), dim), dtype=np.float32))
+    db.metadata = [{"chunk_content": f"chunk {i}", "context": "", "original_index": i} for i in range(rows)]
+    db.save_db()
+    return rows * dim * 4 / 1024 ** 2
+
+
+def run_server(workdir, dim, workers, max_batch, latency, port_queue):
+    vector_db = open_index(
+        INDEX_NAME, data_dir=workdir, client=FakeOpenAI(dim=dim, latency=latency),
+        embedding_cache=EmbeddingCache(path=os.path.join(workdir, "embedding_cache.sqlite")),
+    )
+    sys.stdout = open(os.devnull, "w")
+    serve(vector_db, port=0, workers=workers, max_batch=max_batch, ready=lambda address: port_queue.put(address[1]))
+
+
+def request(connection, method, path, payload=None):
+    body = json.dumps(payload) if payload is not None else None
+    headers = {"Content-Type": "application/json"} if body else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path}: {response.status} {data[:200]!r}")
+    return json.loads(data)
+
+
+def client_process(port, threads, duration, k, seed):
+    """Latências (s) de `threads` conexões keep-alive buscando sem pausa por `duration` segundos."""
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def loop(thread_id):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local, n = [], 0
+        while time.perf_counter() < deadline:
+            payload = {"query": f"consulta {seed}-{thread_id}-{n}", "k": k, "similarity_threshold": 0.0}
+            start = time.perf_counter()
+            request(connection, "POST", "/search", payload)
+            local.append(time.perf_counter() - start)
+            n += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies
+
+
+def worker_pids(server_pid, workers):
+    if workers == 1:
+        return [server_pid]
+    with open(f"/proc/{server_pid}/task/{server_pid}/children") as file:
+        return [int(pid) for pid in file.read().split()]
+
+
+def memory_mb(pid):
+    """(USS, PSS) em MB a partir de /proc/{pid}/smaps_rollup."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return uss / 1024, fields.get("Pss", 0) / 1024
+
+
+def batch_stats(port, pids):
+    """Soma as estatísticas de lote de cada worker (cada conexão nova cai em um worker qualquer)."""
+    stats = {}
+    for _ in range(50 * len(pids)):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        health = request(connection, "GET", "/health")
+        connection.close()
+        stats[health["pid"]] = health
+        if len(stats) == len(pids):
+            break
+    batches = sum(health["batches"] for health in stats.values())
+    queries = sum(health["queries"] for health in stats.values())
+    return queries / batches if batches else 0.0
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(args, workdir, workers, max_batch):
+    context = multiprocessing.get_context("fork")
+    port_queue = context.Queue()
+    server = context.Process(
+        target=run_server, args=(workdir, args.dim, workers, max_batch, args.embedding_latency, port_queue)
+    )
+    server.start()
+    try:
+        port = port_queue.get(timeout=120)
+        # Aquecimento: todos os workers tocam a matriz inteira antes da medição.
+        with context.Pool(args.client_procs) as pool:
+            pool.starmap(client_process, [(port, args.threads, 1.0, args.k, f"aquecimento{i}")
+                                          for i in range(args.client_procs)])
+            start = time.perf_counter()
+            results = pool.starmap(client_process, [(port, args.threads, args.duration, args.k, f"p{i}")
+                                                    for i in range(args.client_procs)])
+            elapsed = time.perf_counter() - start
+        latencies = [latency for result in results for latency in result]
+        pids = worker_pids(server.pid, workers)
+        memory = [memory_mb(pid) for pid in pids]
+        mean_batch = batch_stats(port, pids)
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join(timeout=30)
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "mean_batch": mean_batch,
+        "uss_mb": max(uss for uss, _ in memory),
+        "pss_mb": sum(pss for _, pss in memory) / len(memory),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--client-procs", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads", type=int, default=16, help="Conexões simultâneas por processo cliente.")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--embedding-latency", type=float, default=0.002, help="Latência (s) por chamada de embeddings.")
+    parser.add_argument("--min-efficiency", type=float, default=0.6)
+    parser.add_argument("--max-private-fraction", type=float, default=0.5)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        matrix_mb = build_index(workdir, args.rows, args.dim)
+        print(f"{args.rows} vetores x {args.dim} ({matrix_mb:.0f} MB), {cpus} CPU(s), "
+              f"{args.client_procs} processo(s) cliente x {args.threads} conexões")
+
+        run = measure(args, workdir, 1, 1)
+        print(f"{'1 worker, sem lote':<20} QPS={run['qps']:8.1f}  p50={run['p50_ms']:7.1f} ms  "
+              f"p95={run['p95_ms']:7.1f} ms  lote médio={run['mean_batch']:5.1f}")
+
+        base_qps = None
+        for workers in [int(value) for value in args.workers.split(",")]:
+            run = measure(args, workdir, workers, SERVER_MAX_BATCH)
+            base_qps = base_qps or run["qps"] / workers
+            speedup = run["qps"] / base_qps
+            print(
+                f"{workers:>2} worker(s){'':<9} QPS={run['qps']:8.1f}  p50={run['p50_ms']:7.1f} ms  "
+                f"p95={run['p95_ms']:7.1f} ms  lote médio={run['mean_batch']:5.1f}  aceleração={speedup:4.2f}x  "
+                f"USS/worker={run['uss_mb']:6.1f} MB  PSS/worker={run['pss_mb']:6.1f} MB"
+            )
+            if workers > 1 and workers + args.client_procs <= cpus and speedup < args.min_efficiency * workers:
+                failures.append(f"{workers} workers: aceleração {speedup:.2f}x < {args.min_efficiency * workers:.2f}x")
+            if workers > 1 and run["uss_mb"] > args.max_private_fraction * matrix_mb:
+                failures.append(f"{workers} workers: {run['uss_mb']:.0f} MB privados por worker "
+                                f"(matriz de {matrix_mb:.0f} MB)")
+        if cpus < 2 + args.client_procs:
+            print(f"Aceleração não verificada: {cpus} CPU(s) não comportam 2 workers e os clientes.")
+
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
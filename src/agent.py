@@ -1,22 +1,23 @@
 import os
 import json
-import pickle 
-import numpy as np 
-import openai 
-import cohere
+import functools
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from tqdm import tqdm 
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage, SystemMessage 
-from langchain_openai import ChatOpenAI
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage 
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import MessagesState, StateGraph, START, END
-from langgraph.prebuilt import ToolNode, tools_condition
-from IPython.display import Image, display 
 
 
-from .simple_vectorDB import SimpleVectorDB
+from .simple_vectorDB import SimpleVectorDB, EMBEDDING_MODEL
+from .answer_cache import AnswerCache
+from .context_packer import ContextPacker
 from .document_processor import ContextGenerator
-from .configs import USE_THRESHOLD, USE_RERANK, SIMILARITY_THRESHOLD, USE_HYDE
+from .ingestion import file_sha256
+from .telemetry import telemetry
+from .configs import CHUNK_SIZE, USE_THRESHOLD, USE_RERANK, SIMILARITY_THRESHOLD, USE_HYDE, USE_HYBRID, AGENT_MAX_WORKERS, AGENT_IO_WORKERS, USE_ANSWER_CACHE
 
 
 # Carregar variáveis do ambiente
@@ -24,17 +25,132 @@ load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
 
+class AgentState(MessagesState):
+    # Resultados da busca usados na última resposta do assistente.
+    sources: list
+    # Estatísticas do empacotamento do contexto da última resposta (tokens antes/depois/economizados).
+    context_packing: dict
+
+
 class Agent: 
-    def __init__(self, doc_path: str): 
+    def __init__(self, doc_path: str, embedding_client=None, answer_cache=None, vector_db=None, data_dir="data",
+                 read_only=False): 
         self.doc_path = doc_path 
-        self.llm = ChatOpenAI(model="gpt-4o-mini")
-        self.hyde_rag = ChatOpenAI(model="gpt-4o-mini",
-                                        n=1,
-                                        max_tokens=50, 
-                                        temperature=0.0)
+        self.embedding_client = embedding_client
+        self.data_dir = data_dir
+        # Com read_only o índice nunca é (re)gerado aqui: um documento alterado vira erro.
+        # Usado pelos workers do servidor, que compartilham o índice gerado pelo processo pai.
+        self.read_only = read_only
+        # Cache semântico de respostas (USE_ANSWER_CACHE); aberto no primeiro uso se não for injetado.
+        self.answer_cache = answer_cache
+        # Modelos de chat criados no primeiro uso (langchain_openai só é importado aí).
+        self._llm = None
+        self._hyde_rag = None
+        self._llm_with_tools = None
+        self._llm_lock = threading.Lock()
         self.tools = [self.search_text]
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
-        self.context_generator = ContextGenerator(doc_source=self.doc_path)
+        self.context_generator = ContextGenerator(doc_source=self.doc_path, data_dir=self.data_dir)
+        # Une chunks vizinhos e limita o contexto a CONTEXT_TOKEN_BUDGET tokens.
+        self.context_packer = ContextPacker()
+        # Handle de busca do documento: criado na primeira busca e reutilizado
+        # entre chamadas de run_query enquanto o arquivo de origem não mudar.
+        self._vector_db = None
+        self._doc_stat_signature = None
+        self._doc_hash = None
+        self._vector_db_lock = threading.Lock()
+        if vector_db is not None:
+            # Índice já aberto (ex.: o compartilhado pelos workers do servidor): é reutilizado
+            # enquanto o hash do documento bater com o que o gerou.
+            doc_hash, _, chunk_size = (vector_db.source_signature or "").partition(":")
+            if chunk_size == str(CHUNK_SIZE):
+                self._vector_db = vector_db
+                self._doc_hash = doc_hash
+        # Grafo compilado uma única vez e pool para as chamadas bloqueantes do caminho async.
+        self._graph = None
+        self._graph_lock = threading.Lock()
+        self._io_executor = None
+        self._io_executor_lock = threading.Lock()
+
+    def _create_chat_models(self):
+        with self._llm_lock:
+            if self._llm is None:
+                from langchain_openai import ChatOpenAI
+
+                self._llm = ChatOpenAI(model="gpt-4o-mini")
+                if self._hyde_rag is None:
+                    self._hyde_rag = ChatOpenAI(model="gpt-4o-mini",
+                                                n=1,
+                                                max_tokens=50, 
+                                                temperature=0.0)
+                if self._llm_with_tools is None:
+                    self._llm_with_tools = self._llm.bind_tools(self.tools)
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._create_chat_models()
+        return self._llm
+
+    @property
+    def hyde_rag(self):
+        if self._hyde_rag is None:
+            self._create_chat_models()
+        return self._hyde_rag
+
+    @hyde_rag.setter
+    def hyde_rag(self, model):
+        self._hyde_rag = model
+
+    @property
+    def llm_with_tools(self):
+        if self._llm_with_tools is None:
+            self._create_chat_models()
+        return self._llm_with_tools
+
+    @llm_with_tools.setter
+    def llm_with_tools(self, model):
+        self._llm_with_tools = model
+
+    def _get_vector_db(self) -> SimpleVectorDB:
+        """
+        Retorna o SimpleVectorDB do documento, carregando corpus e índice apenas uma vez.
+        O mtime/tamanho do arquivo de origem é verificado a cada chamada; quando muda,
+        o hash do conteúdo decide se os dados realmente precisam ser recarregados.
+        """
+        with self._vector_db_lock:
+            stat = os.stat(self.doc_path)
+            stat_signature = (stat.st_mtime_ns, stat.st_size)
+            if self._vector_db is not None and stat_signature == self._doc_stat_signature:
+                return self._vector_db
+
+            doc_hash = file_sha256(self.doc_path)
+            if self._vector_db is not None and doc_hash == self._doc_hash:
+                self._doc_stat_signature = stat_signature
+                return self._vector_db
+            if self.read_only:
+                raise RuntimeError(
+                    f"O índice de '{self.doc_path}' está desatualizado; gere-o de novo (ex.: reiniciando o servidor)."
+                )
+
+            name = Path(self.doc_path).stem
+            vector_db = SimpleVectorDB(name=name, api_key=os.getenv("OPENAI_API_KEY"), client=self.embedding_client,
+                                       data_dir=self.data_dir)
+            # O índice em disco guarda o hash do documento que o gerou: se bater, nem o
+            # documento precisa ser relido. Senão, chunks, contextos e embeddings fluem
+            # em lotes direto para o disco (memória limitada, qualquer que seja o documento).
+            source_signature = f"{doc_hash}:{CHUNK_SIZE}"
+            header = vector_db.read_header()
+            if header is None or header.get("source_signature") != source_signature:
+                vector_db.ingest_stream(self.context_generator.iter_contexts(), source_signature=source_signature)
+                vector_db.load_db()
+                vector_db.build_lexical_index()
+            else:
+                vector_db.load_db()
+
+            self._vector_db = vector_db
+            self._doc_stat_signature = stat_signature
+            self._doc_hash = doc_hash
+            return vector_db
     
     def search_text(self, query: str, k: int = 3):
         """
@@ -51,19 +167,10 @@ class Agent:
             Descrição: Define o número máximo de resultados mais relevantes que serão retornados pela busca.
         """
 
-        json_path = self.context_generator.generate_contexts()
-        with open(json_path, "r", encoding="utf-8") as file:
-            json_data = json.load(file)
-
-        name = Path(self.doc_path).stem 
-        
-        vector_db = SimpleVectorDB(name=name, api_key=os.getenv("OPENAI_API_KEY"))
-        
-        vector_db.load_data(json_data)
+        return self.search_texts([query], k=k)[0] # Retorna a lista de dicionários de resultados
 
-        search_query = query
-        if USE_HYDE:
-            hyde_prompt = f"""
+    def _hyde_messages(self, query: str):
+        hyde_prompt = f"""
             Com base na query: {query}, gere uma única frase afirmativas imulando uma resposta, 
             use seu contexto de treinamento para simular essa resposta.
             Ex.:
@@ -71,31 +178,97 @@ class Agent:
             Query: Qual é a espessura do compensado?
             Simulação da respsotas: O compensado de MDF geralmente tem a espessura 0.75
             """
-            response = self.hyde_rag.invoke([SystemMessage(content=hyde_prompt)]) 
-            hypothetical_doc = response.content.strip()
-            hypothetical_doc = hypothetical_doc.split("\n")[0]
-            search_query = hypothetical_doc
-        
-    
-        results = vector_db.search(search_query, k=k, use_rerank=USE_RERANK, rerank_top_n=k)
-        return results # Retorna a lista de dicionários de resultados
-    
-    def assistant(self, state: MessagesState):
-        query = state["messages"][-1].content
-        results = self.search_text(query) 
+        return [SystemMessage(content=hyde_prompt)]
 
-        if USE_THRESHOLD and (not results or results[0]["similarity"] < SIMILARITY_THRESHOLD):
-            return {"messages": [HumanMessage(content="""Desculpe, não encontrei contexto suficiente para responder. 
-    Você poderia reformular sua pergunta com mais detalhes?""")]}
+    def _hypothetical_doc(self, response) -> str:
+        hypothetical_doc = response.content.strip()
+        return hypothetical_doc.split("\n")[0]
+
+    def search_texts(self, queries: list, k: int = 3):
+        """
+        Versão em lote de search_text: as hipóteses do HyDE são geradas em paralelo e
+        todas as queries passam por uma única chamada de SimpleVectorDB.search_batch.
+        Retorna uma lista de resultados por query, na mesma ordem.
+        """
+        vector_db = self._get_vector_db()
+
+        search_queries = list(queries)
+        if USE_HYDE:
+            with telemetry.span("hyde", queries=len(search_queries)):
+                responses = self.hyde_rag.batch(
+                    [self._hyde_messages(query) for query in search_queries],
+                    config={"max_concurrency": AGENT_MAX_WORKERS},
+                )
+            telemetry.add_response_usage("hyde", "gpt-4o-mini", responses)
+            search_queries = [self._hypothetical_doc(response) for response in responses]
+
+        with telemetry.span("search", queries=len(search_queries)):
+            return vector_db.search_batch(
+                search_queries, k=k, use_rerank=USE_RERANK, rerank_top_n=k, use_hybrid=USE_HYBRID
+            )
+
+    def _run_blocking(self, fn, *args):
+        with self._io_executor_lock:
+            if self._io_executor is None:
+                self._io_executor = ThreadPoolExecutor(max_workers=AGENT_IO_WORKERS)
+        return asyncio.get_running_loop().run_in_executor(self._io_executor, fn, *args)
+
+    def _fuse_results(self, result_lists, k, score="similarity"):
+        """
+        Une resultados de várias buscas por chunk, mantendo o maior `score` de cada um. Na
+        busca híbrida o score é o rrf_score, para não desfazer a fusão feita em search_batch.
+        """
+        best = {}
+        for results in result_lists:
+            for result in results:
+                current = best.get(result["original_index"])
+                if current is None or result[score] > current[score]:
+                    best[result["original_index"]] = result
+        fused = sorted(best.values(), key=lambda result: result[score], reverse=True)[:k]
+        return [dict(result, rank_after_similarity_search=rank + 1) for rank, result in enumerate(fused)]
 
-        context_msgs = [
-            SystemMessage(content=(
-                f"[sim={r['similarity']:.2f}]\n"
-                f"Chunk: {r['chunk']}\n"
-                f"Contexto Gerado: {r['context']}" 
-            ))
-            for r in results
-        ]
+    async def asearch_text(self, query: str, k: int = 3):
+        """
+        Versão assíncrona de search_text. A busca com a query original começa ao mesmo
+        tempo que a geração do HyDE; quando a hipótese chega, as duas listas são fundidas
+        (maior similaridade por chunk). Se o HyDE falhar, fica só a busca original.
+        """
+        vector_db = await self._run_blocking(self._get_vector_db)
+        search = functools.partial(vector_db.search, use_hybrid=USE_HYBRID)
+        raw_search = self._run_blocking(search, query, k)
+        if not USE_HYDE:
+            results = await raw_search
+        else:
+            try:
+                with telemetry.span("hyde", queries=1):
+                    response = await self.hyde_rag.ainvoke(self._hyde_messages(query))
+                telemetry.add_response_usage("hyde", "gpt-4o-mini", response)
+                hyde_results = await self._run_blocking(search, self._hypothetical_doc(response), k)
+            except Exception as e:
+                print(f"AVISO: HyDE falhou ({type(e).__name__}: {e}); usando só a busca com a query original.")
+                hyde_results = []
+            results = self._fuse_results([await raw_search, hyde_results], k,
+                                         score="rrf_score" if USE_HYBRID else "similarity")
+
+        if USE_RERANK:
+            results = await self._run_blocking(vector_db._rerank, query, results, k)
+        return results
+
+    def _prompt_messages(self, state: MessagesState, results):
+        """
+        (mensagens enviadas ao LLM, estatísticas do empacotamento), ou (None, None) quando
+        não há contexto relevante suficiente.
+        """
+        # Na busca híbrida o primeiro resultado pode ser um acerto só lexical: vale o melhor cosseno da lista.
+        if USE_THRESHOLD and (not results or max(r["similarity"] for r in results) < SIMILARITY_THRESHOLD):
+            return None, None
+
+        with telemetry.span("context_packing", results=len(results)):
+            blocks, packing = self.context_packer.pack(results)
+        telemetry.add_count("context_tokens_before", packing["tokens_before"])
+        telemetry.add_count("context_tokens_after", packing["tokens_after"])
+        telemetry.add_count("context_tokens_saved", packing["tokens_saved"])
+        context_msgs = [SystemMessage(content=block) for block in blocks]
         
         sys_msg = SystemMessage(content= """
 
@@ -111,23 +284,114 @@ class Agent:
 
     Não responda a pergunta se o contexto não tiver nada haver com a pergunta""")
         
-        prompt_messages = [sys_msg] + context_msgs + state["messages"]
+        return [sys_msg] + context_msgs + state["messages"], packing
+
+    def _no_context_response(self):
+        return {"messages": [HumanMessage(content="""Desculpe, não encontrei contexto suficiente para responder. 
+    Você poderia reformular sua pergunta com mais detalhes?""")]}
+    
+    def assistant(self, state: AgentState):
+        query = state["messages"][-1].content
+        results = self.search_text(query) 
+
+        prompt_messages, packing = self._prompt_messages(state, results)
+        if prompt_messages is None:
+            return self._no_context_response()
+
+        with telemetry.span("llm"):
+            response = self.llm_with_tools.invoke(prompt_messages)
+        telemetry.add_response_usage("llm", "gpt-4o-mini", response)
+        return {"messages": [response], "sources": results, "context_packing": packing}
+
+    async def aassistant(self, state: AgentState):
+        query = state["messages"][-1].content
+        results = await self.asearch_text(query)
+
+        prompt_messages, packing = self._prompt_messages(state, results)
+        if prompt_messages is None:
+            return self._no_context_response()
 
-        return {"messages": [self.llm_with_tools.invoke(prompt_messages)]} 
+        with telemetry.span("llm"):
+            response = await self.llm_with_tools.ainvoke(prompt_messages)
+        telemetry.add_response_usage("llm", "gpt-4o-mini", response)
+        return {"messages": [response], "sources": results, "context_packing": packing}
     
     def build_graph(self):
-        builder = StateGraph(MessagesState)
-        builder.add_node("assistant", self.assistant)
+        from langgraph.prebuilt import ToolNode, tools_condition
+
+        builder = StateGraph(AgentState)
+        # O mesmo nó serve invoke (assistant) e ainvoke (aassistant).
+        builder.add_node("assistant", RunnableLambda(self.assistant, afunc=self.aassistant))
         builder.add_node("tools", ToolNode(self.tools))
         builder.add_edge(START, "assistant")
         builder.add_conditional_edges("assistant", tools_condition)
         builder.add_edge("tools", "assistant")
         return builder.compile()
     
+    def _get_graph(self):
+        with self._graph_lock:
+            if self._graph is None:
+                with telemetry.span("graph_build"):
+                    self._graph = self.build_graph()
+            return self._graph
+
+    def _get_answer_cache(self):
+        if self.answer_cache is None:
+            self.answer_cache = AnswerCache()
+        return self.answer_cache
+
+    def _answer_cache_key(self, vector_db):
+        """
+        Namespace e assinatura das respostas: o documento, o índice que as gerou (hash do
+        documento e CHUNK_SIZE) e as configurações que mudam a resposta. Mudou, invalidou.
+        """
+        signature = json.dumps([
+            vector_db.source_signature, EMBEDDING_MODEL, "gpt-4o-mini", USE_HYDE, USE_RERANK, USE_HYBRID,
+            USE_THRESHOLD, SIMILARITY_THRESHOLD,
+        ])
+        return Path(self.doc_path).stem, signature
+
+    def _cached_answer(self, query):
+        """(resposta em cache ou None, embedding da pergunta); (None, None) com o cache desligado."""
+        if not USE_ANSWER_CACHE:
+            return None, None
+        vector_db = self._get_vector_db()
+        vector = vector_db._embed_texts([query])[0]
+        with telemetry.span("answer_cache"):
+            hit = self._get_answer_cache().lookup(*self._answer_cache_key(vector_db), vector)
+        telemetry.add_cache("answer", hit is not None, hit is None)
+        return hit, vector
+
+    def _cached_state(self, query, hit):
+        return {
+            "messages": [HumanMessage(content=query), AIMessage(content=hit["answer"])],
+            "sources": hit["sources"],
+            "answer_cache": {"question": hit["question"], "similarity": hit["similarity"]},
+        }
+
+    def _remember_answer(self, query, vector, final_state):
+        """Guarda respostas finais do LLM (a resposta padrão de falta de contexto não entra)."""
+        if vector is None or "sources" not in final_state:
+            return
+        answer = final_state["messages"][-1]
+        if not isinstance(answer, AIMessage) or answer.tool_calls or not answer.content:
+            return
+        self._get_answer_cache().put(
+            *self._answer_cache_key(self._get_vector_db()), query, vector, answer.content, final_state["sources"]
+        )
+
+    def invoke(self, query):
+        """Estado final de uma query (com o cache de respostas), sem imprimir nada."""
+        with telemetry.span("query"):
+            hit, vector = self._cached_answer(query)
+            if hit is not None:
+                return self._cached_state(query, hit)
+            final_state = self._get_graph().invoke({"messages": [HumanMessage(content=query)]})
+            self._remember_answer(query, vector, final_state)
+            return final_state
+
     def run_query(self, query):
-        graph = self.build_graph()
-        
-        final_state = graph.invoke({"messages": [HumanMessage(content=query)]})
+        final_state = self.invoke(query)
         
         
         if final_state and 'messages' in final_state and final_state['messages']:
@@ -135,6 +399,27 @@ class Agent:
         
         return final_state
 
+    def run_queries(self, queries, max_workers: int = AGENT_MAX_WORKERS):
+        """
+        Executa várias queries independentes em um pool de threads, compartilhando o grafo
+        e o índice do documento. Retorna os estados finais na mesma ordem das queries.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.invoke, queries))
+
+    async def arun_query(self, query):
+        """
+        Versão assíncrona de run_query, para atender muitas conversas simultâneas no mesmo
+        event loop. Usa o grafo compilado uma única vez e retorna o estado final sem imprimir.
+        """
+        with telemetry.span("query"):
+            hit, vector = await self._run_blocking(self._cached_answer, query)
+            if hit is not None:
+                return self._cached_state(query, hit)
+            final_state = await self._get_graph().ainvoke({"messages": [HumanMessage(content=query)]})
+            await self._run_blocking(self._remember_answer, query, vector, final_state)
+            return final_state
+
 if __name__ == "__main__":
     try:
         print("Iniciando Agente (versão de query única)...")
@@ -160,6 +445,8 @@ if __name__ == "__main__":
         if user_query.strip():
             print("Agente: Processando...")
             agent_executor.run_query(user_query)
+            if telemetry.enabled:
+                print(telemetry.to_prometheus())
         else:
             print("Nenhuma query fornecida.")
 
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+
+from .configs import ANSWER_CACHE_PATH, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES
+
+
+class AnswerCache:
+    """
+    Cache semântico de respostas: guarda a pergunta (embedding normalizado), a resposta
+    final e os chunks usados. Uma pergunta nova com similaridade de cosseno >= `similarity_threshold`
+    com uma já respondida reaproveita a resposta, sem HyDE, busca nem LLM.
+
+    As entradas pertencem a um `namespace` (ex.: o documento) e a uma `signature` que
+    identifica o índice e as configurações que produziram a resposta; quando a assinatura
+    muda, as entradas antigas do namespace são apagadas. Entradas expiram após `ttl`
+    segundos e, acima de `max_entries`, as menos usadas recentemente são descartadas.
+    Fica em SQLite (persistente entre execuções); os vetores de cada namespace são mantidos
+    em uma matriz em memória, recarregada quando este processo altera o cache.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, similarity_threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.similarity_threshold = similarity_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (namespace, signature) -> (ids, matriz de vetores, criação)
+        self._matrices = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                question TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_namespace ON answers(namespace, signature)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_access ON answers(last_access)")
+        self._conn.commit()
+
+    def _load_matrix(self, namespace, signature):
+        key = (namespace, signature)
+        if key not in self._matrices:
+            # Entradas de outra assinatura vieram de um índice ou configuração que não vale mais.
+            deleted = self._conn.execute(
+                "DELETE FROM answers WHERE namespace = ? AND signature != ?", (namespace, signature)
+            ).rowcount
+            if deleted:
+                self._conn.commit()
+                self._matrices = {k: v for k, v in self._matrices.items() if k[0] != namespace}
+            rows = self._conn.execute(
+                "SELECT id, vector, created_at FROM answers WHERE namespace = ? AND signature = ?",
+                (namespace, signature),
+            ).fetchall()
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = (
+                np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                if rows else np.empty((0, 0), dtype=np.float32)
+            )
+            created = np.array([row[2] for row in rows], dtype=np.float64)
+            self._matrices[key] = (ids, vectors, created)
+        return self._matrices[key]
+
+    def lookup(self, namespace: str, signature: str, vector) -> dict:
+        """
+        Resposta da pergunta mais parecida com `vector` (já normalizado), ou None se nenhuma
+        passar do limiar. O resultado traz question, answer, sources e similarity.
+        """
+        with self._lock:
+            ids, vectors, created = self._load_matrix(namespace, signature)
+            if len(ids):
+                similarities = vectors @ np.asarray(vector, dtype=np.float32)
+                # Expiradas não contam; são apagadas no próximo put.
+                similarities[created + self.ttl < time.time()] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    row = self._conn.execute(
+                        "SELECT question, answer, sources FROM answers WHERE id = ?", (int(ids[best]),)
+                    ).fetchone()
+                    if row is not None:
+                        self._conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (time.time(), int(ids[best])))
+                        self._conn.commit()
+                        self.hits += 1
+                        return {
+                            "question": row[0],
+                            "answer": row[1],
+                            "sources": json.loads(row[2]),
+                            "similarity": float(similarities[best]),
+                        }
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, signature: str, question: str, vector, answer: str, sources: list) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (namespace, signature, question, vector, answer, sources, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (namespace, signature, question, np.asarray(vector, dtype=np.float32).tobytes(), answer,
+                 json.dumps(sources, ensure_ascii=False), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+            self._matrices.clear()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+
+    def invalidate(self, namespace: str = None) -> None:
+        """Apaga as respostas de `namespace` (ou todas)."""
+        with self._lock:
+            if namespace is None:
+                self._conn.execute("DELETE FROM answers")
+            else:
+                self._conn.execute("DELETE FROM answers WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+            self._matrices.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .document_processor import ContextGenerator
+from .embedding_cache import EmbeddingCache
+from .ingestion import file_sha256
+from .simple_vectorDB import SimpleVectorDB
+from .configs import CHUNK_SIZE, COLLECTIONS_DIR, COLLECTION_MEMORY_BUDGET_MB
+
+
+class CollectionManager:
+    """
+    Coleções de documentos: cada coleção é um único SimpleVectorDB em {root}/{nome}/ com
+    os chunks de vários documentos, marcados pelo campo "document" dos metadados (usado
+    pelos filtros de busca). As coleções são abertas sob demanda e as menos usadas
+    recentemente são fechadas quando a memória estimada passa de `memory_budget_mb`.
+    """
+
+    def __init__(self, root=COLLECTIONS_DIR, memory_budget_mb=COLLECTION_MEMORY_BUDGET_MB,
+                 embedding_client=None, context_client=None, embedding_cache=None):
+        self.root = root
+        self.memory_budget = memory_budget_mb * 2**20
+        self.embedding_client = embedding_client
+        self.context_client = context_client
+        # Um só cache para todas as coleções: a query é embutida uma vez por busca.
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        os.makedirs(self.root, exist_ok=True)
+        # Coleções abertas em ordem de uso (a mais recente no fim) e memória estimada de cada uma.
+        self._open = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _documents_path(self, name):
+        return os.path.join(self.root, name, "documents.json")
+
+    def _new_db(self, name):
+        return SimpleVectorDB(
+            name=name, client=self.embedding_client, embedding_cache=self.embedding_cache, data_dir=self.root
+        )
+
+    def list_collections(self):
+        """Coleções com índice em disco."""
+        return sorted(
+            entry.name for entry in os.scandir(self.root)
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, "header.json"))
+        )
+
+    def documents(self, name):
+        """{documento: sha256} dos documentos indexados na coleção `name`."""
+        path = self._documents_path(name)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def ingest_directory(self, name, directory, pattern="*.txt"):
+        """Indexa na coleção `name` os arquivos de `directory` que casam com `pattern`."""
+        return self.ingest_documents(name, sorted(Path(directory).glob(pattern)))
+
+    def ingest_documents(self, name, paths):
+        """
+        Indexa `paths` na coleção `name`, substituindo o conteúdo anterior. Cada documento
+        é identificado pelo nome do arquivo sem extensão. Os contextos de ponte e os embeddings
+        de documentos já indexados são reaproveitados, e se nenhum documento mudou nada é refeito.
+        Retorna o número de chunks indexados.
+        """
+        documents = {}
+        for path in paths:
+            document = Path(path).stem
+            if document in documents:
+                raise ValueError(f"Documento '{document}' aparece mais de uma vez na coleção '{name}'")
+            documents[document] = (str(path), file_sha256(path))
+
+        hashes = {document: digest for document, (_, digest) in documents.items()}
+        source_signature = hashlib.sha256(
+            json.dumps([hashes, CHUNK_SIZE], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+        vector_db = self._new_db(name)
+        header = vector_db.read_header()
+        if header is not None and header.get("source_signature") == source_signature:
+            return header["count"]
+
+        contexts_dir = os.path.join(vector_db.db_dir, "contexts")
+
+        def entries():
+            for document, (path, _) in documents.items():
+                generator = ContextGenerator(path, client=self.context_client, data_dir=contexts_dir)
+                for entry in generator.iter_contexts():
+                    yield dict(entry, document=document)
+
+        # O handle aberto (se houver) fica desatualizado: é descartado antes da gravação.
+        self.close(name)
+        vector_db.ingest_stream(entries(), source_signature=source_signature)
+        vector_db.load_db()
+        vector_db.build_lexical_index()
+        with open(self._documents_path(name), "w", encoding="utf-8") as file:
+            json.dump(hashes, file, ensure_ascii=False, indent=2)
+        return len(vector_db.metadata)
+
+    @staticmethod
+    def _estimate_memory(vector_db):
+        """Bytes estimados de uma coleção aberta: vetores, metadados e índice lexical."""
+        size = vector_db.embeddings.nbytes
+        for path in (vector_db.metadata_path, vector_db.lexical_path):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def open(self, name):
+        """SimpleVectorDB da coleção `name`, carregado na primeira chamada e mantido em cache LRU."""
+        with self._lock:
+            vector_db = self._open.get(name)
+            if vector_db is not None:
+                self._open.move_to_end(name)
+                return vector_db
+
+            vector_db = self._new_db(name)
+            if vector_db.read_header() is None:
+                raise KeyError(f"Coleção '{name}' não encontrada em {self.root}")
+            vector_db.load_db()
+            self._open[name] = vector_db
+            self._sizes[name] = self._estimate_memory(vector_db)
+            # A coleção recém-aberta nunca é descartada, mesmo sozinha acima do limite.
+            while len(self._open) > 1 and self.memory_used() > self.memory_budget:
+                evicted, _ = self._open.popitem(last=False)
+                del self._sizes[evicted]
+                self.evictions += 1
+            return vector_db
+
+    def close(self, name):
+        """Descarta o handle aberto da coleção `name` (buscas em andamento continuam válidas)."""
+        with self._lock:
+            self._open.pop(name, None)
+            self._sizes.pop(name, None)
+
+    def open_collections(self):
+        """Coleções abertas, da menos para a mais recentemente usada."""
+        with self._lock:
+            return list(self._open)
+
+    def memory_used(self):
+        return sum(self._sizes.values())
+
+    def search(self, query, k=10, collections=None, documents=None, similarity_threshold=0.5, use_hybrid=False):
+        """
+        Busca `query` nas coleções `collections` (todas, se None), opcionalmente restrita aos
+        documentos `documents`. Os resultados de cada coleção são fundidos pela similaridade
+        e recebem o campo "collection".
+        """
+        if collections is None:
+            collections = self.list_collections()
+        results = []
+        for name in collections:
+            hits = self.open(name).search(
+                query, k=k, similarity_threshold=similarity_threshold, use_hybrid=use_hybrid, documents=documents
+            )
+            results.extend(dict(hit, collection=name) for hit in hits)
+        results = sorted(results, key=lambda result: result["similarity"], reverse=True)[:k]
+        return [dict(result, rank_after_similarity_search=rank + 1) for rank, result in enumerate(results)]
@@ -3,16 +3,47 @@ Confgurações no Agente Orquestrador
 - USE_THRESHOLD: Se True, ativa a filtragem de similaridade.
 - SIMILARITY_THRESHOLD: Limite de similaridade para considerar um resultado relevante.
 - USE_RERANK: Se True, ativa o reranking dos resultados.
+- RERANK_BACKEND: Reranker usado: "cohere" (API), "bm25" (lexical, em processo) ou "cross-encoder" (modelo local, extra `rerank-local`).
+- RERANK_COHERE_MODEL / RERANK_CROSS_ENCODER_MODEL: Modelos dos rerankers "cohere" e "cross-encoder".
 - USE_HYDE: Se True, ativa o uso do modelo Hyde para gerar respostas hipotéticas.
+- CONTEXT_CONCURRENCY: Número máximo de chamadas simultâneas ao LLM na geração dos contextos de ponte.
+- CONTEXT_MAX_RETRIES / CONTEXT_RETRY_BASE_DELAY: Tentativas e atraso inicial (s) do backoff exponencial em erros de rate limit.
+- EMBEDDING_CACHE_PATH / EMBEDDING_CACHE_MAX_ENTRIES: Arquivo SQLite do cache de embeddings e limite de entradas (LRU).
+- INDEX_BACKEND: Backend da busca vetorial: "exact" (força bruta), "ivf" (aproximada) ou os quantizados "int8"/"binary".
+- INT8_RESCORE_FACTOR / BINARY_RESCORE_FACTOR: Quantos candidatos (múltiplo de k) os índices quantizados re-pontuam com os vetores float.
+- AGENT_MAX_WORKERS: Tamanho do pool de threads de Agent.run_queries (e concorrência do HyDE em lote).
+- AGENT_IO_WORKERS: Threads para as chamadas bloqueantes (embeddings, rerank) de Agent.arun_query.
+- USE_HYBRID: Se True, combina a busca vetorial com o índice lexical BM25 (reciprocal rank fusion).
+- HYBRID_CANDIDATES / RRF_K: Candidatos de cada ranking na busca híbrida e constante k da fusão (1 / (k + posição)).
+- CONTEXT_TOKEN_BUDGET: Máximo de tokens (cl100k_base) dos trechos de contexto enviados ao LLM; chunks vizinhos são unidos antes (ver context_packer.py).
+- INGEST_BATCH_SIZE: Chunks por lote na ingestão em streaming (contextos -> embeddings -> índice em disco).
+- COLLECTIONS_DIR: Pasta das coleções de documentos (um índice compartilhado por coleção, ver collection_manager.py).
+- COLLECTION_MEMORY_BUDGET_MB: Memória estimada máxima das coleções abertas; acima dela as menos usadas são fechadas (LRU).
+- USE_ANSWER_CACHE: Se True, perguntas parecidas com uma já respondida (mesmo índice e configurações) reaproveitam a resposta.
+- ANSWER_CACHE_THRESHOLD / ANSWER_CACHE_TTL / ANSWER_CACHE_MAX_ENTRIES: Similaridade mínima entre as perguntas, validade (s) e limite de entradas (LRU) do cache de respostas.
+- PROFILING: Se True, mede tempo, tokens, custo e acertos de cache por etapa (ver telemetry.py); desligado não custa nada.
+- PROFILING_LOG_PATH: Se definido, cada span medida é gravada nele como uma linha JSON.
+- SERVER_WORKERS: Processos do servidor de busca (server.py); 0 = um por CPU.
+- SERVER_MAX_BATCH / SERVER_BATCH_WAIT_MS: Máximo de buscas simultâneas juntadas em um search_batch por worker e espera (ms) por mais buscas antes de executar o lote (0 = só junta as que já estão na fila).
+- SERVER_RESTART_DELAY / SERVER_MAX_FAST_FAILURES: Espera inicial (s, dobra a cada falha seguida) antes de recriar um worker que terminou com erro, e quantas falhas rápidas seguidas (worker vivo por menos de SERVER_FAST_FAILURE_SECONDS) derrubam o servidor.
+- IVF_NLIST / IVF_NPROBE: Número de listas do IVF (0 = raiz quadrada do número de vetores) e de listas visitadas por busca.
 """
 
-# --- Configurações Rerank Cohere ---
+# --- Configurações Rerank ---
 USE_RERANK = False
+RERANK_BACKEND = "cohere"
+RERANK_COHERE_MODEL = "rerank-multilingual-v3.0"
+RERANK_CROSS_ENCODER_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
 
 # --- Configurações de filtragem ---
 USE_THRESHOLD = True
 SIMILARITY_THRESHOLD = 0.2
 
+# --- Busca híbrida (BM25 + vetorial) ---
+USE_HYBRID = False
+HYBRID_CANDIDATES = 50
+RRF_K = 60
+
 # --- Configurações do Hyde RAG
 USE_HYDE = True
 
@@ -20,5 +51,51 @@ USE_HYDE = True
 # --- Maxímo de tokens por chunk ---
 CHUNK_SIZE = 500
 
+# --- Contexto enviado ao LLM ---
+CONTEXT_TOKEN_BUDGET = 3000
+
+# --- Geração dos contextos de ponte ---
+CONTEXT_CONCURRENCY = 8
+CONTEXT_MAX_RETRIES = 5
+CONTEXT_RETRY_BASE_DELAY = 1.0
+
+# --- Cache persistente de embeddings (queries, HyDE e chunks) ---
+EMBEDDING_CACHE_PATH = "data/embedding_cache.sqlite"
+EMBEDDING_CACHE_MAX_ENTRIES = 50_000
+
+# --- Ingestão em streaming ---
+INGEST_BATCH_SIZE = 128
+
+# --- Coleções de documentos ---
+COLLECTIONS_DIR = "data/collections"
+COLLECTION_MEMORY_BUDGET_MB = 1024
+
+# --- Backend da busca vetorial ---
+INDEX_BACKEND = "exact"
+IVF_NLIST = 0
+IVF_NPROBE = 8
+INT8_RESCORE_FACTOR = 4
+BINARY_RESCORE_FACTOR = 20
+
+# --- Cache semântico de respostas ---
+USE_ANSWER_CACHE = False
+ANSWER_CACHE_PATH = "data/answer_cache.sqlite"
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_TTL = 7 * 24 * 3600
+ANSWER_CACHE_MAX_ENTRIES = 5_000
+
+# --- Telemetria ---
+PROFILING = False
+PROFILING_LOG_PATH = None
 
+# --- Servidor de busca (pré-fork) ---
+SERVER_WORKERS = 0
+SERVER_MAX_BATCH = 64
+SERVER_BATCH_WAIT_MS = 0.0
+SERVER_RESTART_DELAY = 0.5
+SERVER_MAX_FAST_FAILURES = 5
+SERVER_FAST_FAILURE_SECONDS = 10.0
 
+# --- Consultas em lote do agente ---
+AGENT_MAX_WORKERS = 4
+AGENT_IO_WORKERS = 32
@@ -0,0 +1,129 @@
+from .configs import CONTEXT_TOKEN_BUDGET
+
+# Mesmo tokenizer do DocumentProcessor.
+ENCODING_NAME = "cl100k_base"
+
+
+def text_overlap(a, b, probe_size=32):
+    """Tamanho do maior sufixo de `a` que é prefixo de `b` (ou len(b), se `b` está contido no fim de `a`)."""
+    probe = b[:probe_size]
+    start = a.find(probe) if probe else -1
+    while start != -1:
+        tail = a[start:]
+        if b.startswith(tail):
+            return len(tail)
+        if tail.startswith(b):
+            return len(b)
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def format_block(score, first, last, text, contexts):
+    span = f"{first}" if first == last else f"{first}-{last}"
+    context = "\n".join(contexts)
+    return f"[sim={score:.2f}] [trechos {span}]\nChunk: {text}\nContexto Gerado: {context}"
+
+
+class ContextPacker:
+    """
+    Monta o contexto enviado ao LLM a partir dos resultados da busca. Chunks vizinhos
+    (original_index consecutivos do mesmo documento) são unidos em um único trecho contínuo,
+    removendo o texto repetido pela sobreposição do DocumentProcessor, e os trechos entram
+    em ordem de relevância até `token_budget` tokens (cl100k_base).
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._encoding = None
+
+    @property
+    def encoding(self):
+        # tiktoken (e o arquivo BPE) só é carregado no primeiro empacotamento.
+        if self._encoding is None:
+            import tiktoken
+
+            self._encoding = tiktoken.get_encoding(ENCODING_NAME)
+        return self._encoding
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _spans(self, results):
+        """Trechos contínuos: {rank, score, indices, text, contexts}, na ordem do documento."""
+        ranked = sorted(
+            enumerate(results), key=lambda item: (str(item[1].get("document", "")), item[1]["original_index"])
+        )
+        spans = []
+        for rank, result in ranked:
+            current = spans[-1] if spans else None
+            if (
+                current is not None
+                and current["document"] == result.get("document")
+                and result["original_index"] - current["indices"][-1] <= 1
+            ):
+                if result["original_index"] != current["indices"][-1]:
+                    overlap = text_overlap(current["text"], result["chunk"])
+                    current["text"] += result["chunk"][overlap:] if overlap else "\n" + result["chunk"]
+                    current["indices"].append(result["original_index"])
+                    if result["context"] and result["context"] not in current["contexts"]:
+                        current["contexts"].append(result["context"])
+                current["rank"] = min(current["rank"], rank)
+                current["score"] = max(current["score"], result["similarity"])
+                continue
+            spans.append({
+                "document": result.get("document"),
+                "rank": rank,
+                "score": result["similarity"],
+                "indices": [result["original_index"]],
+                "text": result["chunk"],
+                "contexts": [result["context"]] if result["context"] else [],
+            })
+        return spans
+
+    def _truncate(self, span, budget):
+        """Bloco do trecho cortado para caber em `budget` tokens (os contextos saem se nem eles couberem)."""
+        contexts = span["contexts"]
+        empty = format_block(span["score"], span["indices"][0], span["indices"][-1], "", contexts)
+        if self.count_tokens(empty) > budget:
+            contexts = []
+            empty = format_block(span["score"], span["indices"][0], span["indices"][-1], "", contexts)
+        room = max(budget - self.count_tokens(empty), 0)
+        text = self.encoding.decode(self.encoding.encode(span["text"], disallowed_special=())[:room])
+        return format_block(span["score"], span["indices"][0], span["indices"][-1], text, contexts)
+
+    def pack(self, results):
+        """
+        Retorna (blocos, estatísticas). Cada bloco é o texto de uma mensagem de contexto, na
+        ordem de relevância do melhor resultado do trecho. As estatísticas comparam os tokens
+        com o formato antigo (uma mensagem por resultado, sem orçamento).
+        """
+        tokens_before = sum(
+            self.count_tokens(f"[sim={r['similarity']:.2f}]\nChunk: {r['chunk']}\nContexto Gerado: {r['context']}")
+            for r in results
+        )
+        spans = sorted(self._spans(results), key=lambda span: span["rank"])
+
+        blocks, used, dropped = [], 0, 0
+        for span in spans:
+            block = format_block(span["score"], span["indices"][0], span["indices"][-1], span["text"], span["contexts"])
+            tokens = self.count_tokens(block)
+            if used + tokens > self.token_budget:
+                if blocks:
+                    dropped += 1
+                    continue
+                # Nem o trecho mais relevante cabe: entra cortado, para o LLM ter algum contexto.
+                block = self._truncate(span, self.token_budget)
+                tokens = self.count_tokens(block)
+            blocks.append(block)
+            used += tokens
+
+        stats = {
+            "results": len(results),
+            "spans": len(spans),
+            "blocks": len(blocks),
+            "dropped_spans": dropped,
+            "tokens_before": tokens_before,
+            "tokens_after": used,
+            "tokens_saved": tokens_before - used,
+        }
+        return blocks, stats
@@ -1,18 +1,51 @@
 import os
 import json
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from openai import OpenAI
 from pathlib import Path
-from langchain_text_splitters import TokenTextSplitter
-from configs import CHUNK_SIZE
+from .configs import CHUNK_SIZE, CONTEXT_CONCURRENCY, CONTEXT_MAX_RETRIES, CONTEXT_RETRY_BASE_DELAY
+from .ingestion import DiskLookup, JsonArrayWriter, chunk_hash, iter_batches, iter_json_array
+from .telemetry import telemetry
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+
+def iter_windows(chunk_texts):
+    """
+    Percorre um iterável de chunks com uma janela deslizante, sem materializá-lo:
+    gera (anterior, chunk, seguinte, chave do contexto) para cada chunk.
+    """
+    previous, previous_hash = None, ""
+    current = current_hash = None
+    for text in chunk_texts:
+        text_hash = chunk_hash(text)
+        if current is not None:
+            yield previous, current, text, chunk_hash("|".join((previous_hash, current_hash, text_hash)))
+            previous, previous_hash = current, current_hash
+        current, current_hash = text, text_hash
+    if current is not None:
+        yield previous, current, None, chunk_hash("|".join((previous_hash, current_hash, "")))
+
+
+def context_keys(chunk_texts: list) -> list:
+    """
+    Chave de cada contexto de ponte: hash do chunk junto com os hashes dos vizinhos.
+    O contexto só precisa ser refeito quando o chunk ou um dos adjacentes muda.
+    """
+    return [key for _, _, _, key in iter_windows(chunk_texts)]
+
+
 class DocumentProcessor:
-    def __init__(self, doc_source: str):
+    def __init__(self, doc_source: str, chunk_size: int = CHUNK_SIZE):
         self.doc_source = doc_source
-        self.max_tokens_per_chunk = CHUNK_SIZE
+        self.max_tokens_per_chunk = chunk_size
+        from langchain_text_splitters import TokenTextSplitter
+
         self.text_splitter = TokenTextSplitter(
             encoding_name="cl100k_base",
             chunk_size=self.max_tokens_per_chunk,
@@ -30,10 +63,78 @@ class DocumentProcessor:
         chunk_texts = self.text_splitter.split_text(full_text_content)
         return chunk_texts, full_text_content
 
+    @staticmethod
+    def _safe_cut(text: str) -> int:
+        """
+        Posição de um espaço entre duas letras perto do fim de `text`. O pré-tokenizador do
+        cl100k_base sempre começa uma nova parte em " palavra", então codificar os dois lados
+        separadamente produz os mesmos tokens que codificar o texto inteiro.
+        """
+        cut = text.rfind(" ")
+        while cut > 0:
+            if cut + 1 < len(text) and text[cut - 1].isalpha() and text[cut + 1].isalpha():
+                return cut
+            cut = text.rfind(" ", 0, cut)
+        return 0
+
+    def iter_chunks(self, block_chars: int = 1 << 20):
+        """
+        Versão em streaming de get_chunks: lê o arquivo em blocos de `block_chars` caracteres
+        e gera os mesmos chunks (janelas de tokens com 50% de sobreposição) sem carregar o
+        texto inteiro, mantendo em memória apenas o bloco atual.
+        """
+        file_path = Path(self.doc_source)
+        if not file_path.is_file() or file_path.suffix.lower() != ".txt":
+            raise ValueError(f"Arquivo de origem não é .txt válido: {self.doc_source}")
+
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        size = self.max_tokens_per_chunk
+        stride = size - int(self.max_tokens_per_chunk * 0.5)
+        tokens, carry = [], ""
+        with open(file_path, "r", encoding="utf-8") as f:
+            while True:
+                block = f.read(block_chars)
+                text = carry + block
+                if block:
+                    cut = self._safe_cut(text)
+                    text, carry = text[:cut], text[cut:]
+                tokens.extend(encoding.encode(text))
+
+                # Só emite janelas que certamente não são a última; o fim do arquivo decide o resto.
+                start = 0
+                while len(tokens) - start > size:
+                    chunk = encoding.decode(tokens[start:start + size])
+                    if chunk:
+                        yield chunk
+                    start += stride
+                del tokens[:start]
+                if not block:
+                    break
+
+        # Mesmo laço do TokenTextSplitter para a cauda do documento.
+        start = 0
+        while start < len(tokens):
+            end = min(start + size, len(tokens))
+            chunk = encoding.decode(tokens[start:end])
+            if chunk:
+                yield chunk
+            if end == len(tokens):
+                break
+            start += stride
+
 class ContextGenerator:
-    def __init__(self, doc_source: str):
+    def __init__(self, doc_source: str, client=None, max_workers: int = CONTEXT_CONCURRENCY, data_dir: str = "data"):
         self.doc_source = doc_source
-        self.client = OpenAI(api_key=openai_api_key)
+        # Pasta do JSON de contextos e do checkpoint.
+        self.data_dir = data_dir
+        # Cliente da OpenAI criado na primeira geração de contexto, se não for injetado.
+        self.client = client
+        self._client_lock = threading.Lock()
+        self.max_workers = max_workers
+        self.reused_contexts = 0
+        self.generated_contexts = 0
 
     def situate_context(self, current_chunk: str, prev_chunk: str = None, next_chunk: str = None) -> str:
         prompt_parts = []
@@ -80,49 +181,198 @@ Responda APENAS com a frase contextualizadora para o TRECHO PRINCIPAL que você
 """
         final_prompt = "\n".join(prompt_parts) + instruction
         
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": final_prompt},
-            ],
-            max_tokens=150, # Reduzido, pois o contexto de entrada é menor
-            temperature=0.0
-        )
+        response = self._create_completion(final_prompt)
         return response.choices[0].message.content
 
+    def _get_client(self):
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    from openai import OpenAI
+
+                    self.client = OpenAI(api_key=openai_api_key)
+        return self.client
+
+    def _create_completion(self, final_prompt: str):
+        import openai
+
+        # Backoff exponencial com jitter em rate limit/timeout; outros erros sobem direto.
+        for attempt in range(CONTEXT_MAX_RETRIES + 1):
+            try:
+                with telemetry.span("context_generation", attempt=attempt):
+                    response = self._get_client().chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": final_prompt},
+                        ],
+                        max_tokens=150, # Reduzido, pois o contexto de entrada é menor
+                        temperature=0.0
+                    )
+                telemetry.add_response_usage("context_generation", "gpt-4o-mini", response)
+                return response
+            except (openai.RateLimitError, openai.APITimeoutError):
+                if attempt == CONTEXT_MAX_RETRIES:
+                    raise
+                time.sleep(CONTEXT_RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random()))
+
     def _json_path(self) -> str:
         stem = Path(self.doc_source).stem
-        data_dir = Path("data")
+        data_dir = Path(self.data_dir)
         data_dir.mkdir(parents=True, exist_ok=True)
         return str(data_dir / f"{stem}_chunks_with_context_adj.json") # Nome do arquivo alterado
     
-    def generate_contexts(self) -> str:
+    def _checkpoint_path(self) -> str:
+        return str(Path(self._json_path()).with_suffix(".jsonl"))
+
+    def _iter_checkpoint(self, checkpoint_path: str):
+        if not os.path.exists(checkpoint_path):
+            return
+        with open(checkpoint_path, "r", encoding="utf-8") as fp:
+            for line in fp:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma interrupção: o chunk é refeito.
+                    continue
+                if "context_key" in entry:
+                    yield entry["context_key"], entry["context"]
+
+    def _iter_existing_contexts(self, json_path: str):
+        """(chave, contexto) de cada entrada do JSON atual, na ordem dos chunks."""
+        if not os.path.exists(json_path):
+            return
+        entries = iter_json_array(json_path)
+        first = next(entries, None)
+        if first is None:
+            return
+        if "context_key" in first:
+            yield first["context_key"], first["context"]
+            for entry in entries:
+                yield entry["context_key"], entry["context"]
+            return
+        # JSONs antigos não têm "context_key": a chave é recalculada a partir da ordem dos chunks.
+        contexts = deque([first["context"]])
+
+        def chunks():
+            yield first["chunk"]
+            for entry in entries:
+                contexts.append(entry["context"])
+                yield entry["chunk"]
+
+        for _, _, _, key in iter_windows(chunks()):
+            yield key, contexts.popleft()
+
+    def _build_lookup(self, json_path: str, checkpoint_path: str):
+        """
+        Contextos conhecidos (checkpoint + JSON atual) em um DiskLookup chave -> [contexto,
+        veio do JSON], e quantas entradas o JSON atual tem.
+        """
+        lookup = DiskLookup(str(Path(json_path).parent))
+        existing = 0
+        for batch in iter_batches(self._iter_checkpoint(checkpoint_path), 1000):
+            lookup.put_many((key, [context, False]) for key, context in batch)
+        for batch in iter_batches(self._iter_existing_contexts(json_path), 1000):
+            lookup.put_many((key, [context, True]) for key, context in batch)
+            existing += len(batch)
+        return lookup, existing
+
+    def iter_contexts(self):
+        """
+        Gera as entradas {chunk, context, chunk_hash, context_key} na ordem do documento,
+        em streaming: o arquivo é lido em blocos, cada chunk é contextualizado com os vizinhos
+        de uma janela deslizante e no máximo `max_workers` chamadas ao LLM ficam em andamento
+        (com uma fila limitada de chunks prontos aguardando os anteriores). A memória não
+        depende do tamanho do documento.
+
+        Contextos do JSON atual ou do checkpoint .jsonl são reaproveitados pela chave de hash
+        (consultados em um SQLite temporário). O JSON de saída é gravado à medida que as
+        entradas são geradas e só substitui o atual no fim; se nada mudou, o atual é mantido.
+        """
         json_path = self._json_path()
-        if os.path.exists(json_path): # Verifica se o JSON com novo nome já existe
-            return json_path
-        
+        checkpoint_path = self._checkpoint_path()
         processor = DocumentProcessor(self.doc_source)
-        chunk_texts_list, _ = processor.get_chunks() # Não precisamos mais do full_document_text aqui
-        results = []
-        
-        num_chunks_total = len(chunk_texts_list)
-
-        for i, current_chunk_text in enumerate(chunk_texts_list):
-            prev_chunk_text = chunk_texts_list[i-1] if i > 0 else None
-            next_chunk_text = chunk_texts_list[i+1] if i < (num_chunks_total - 1) else None
-            
-            contextualized_text = self.situate_context(
-                current_chunk=current_chunk_text,
-                prev_chunk=prev_chunk_text,
-                next_chunk=next_chunk_text
+        lookup, existing_count = self._build_lookup(json_path, checkpoint_path)
+        existing_keys = (key for key, _ in self._iter_existing_contexts(json_path))
+        unchanged = existing_count > 0
+        total = generated = reused_existing = 0
+
+        writer = JsonArrayWriter(json_path)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        inflight = deque()
+        try:
+            with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+
+                def finish(item):
+                    index, chunk, key, context = item
+                    if not isinstance(context, str):
+                        context = context.result()
+                        checkpoint.write(json.dumps(
+                            {"context_key": key, "index": index, "chunk": chunk, "context": context},
+                            ensure_ascii=False,
+                        ) + "\n")
+                        checkpoint.flush()
+                    entry = {"chunk": chunk, "context": context, "chunk_hash": chunk_hash(chunk), "context_key": key}
+                    writer.write(entry)
+                    return entry
+
+                for index, (prev_chunk, chunk, next_chunk, key) in enumerate(iter_windows(processor.iter_chunks())):
+                    total += 1
+                    if unchanged and next(existing_keys, None) != key:
+                        unchanged = False
+                    known = lookup.get(key) if lookup.count else None
+                    if known is None:
+                        context = executor.submit(self.situate_context, chunk, prev_chunk, next_chunk)
+                        generated += 1
+                    else:
+                        context, from_existing = known
+                        reused_existing += from_existing
+                    inflight.append((index, chunk, key, context))
+                    # Entrega em ordem: espera o mais antigo só quando a fila enche.
+                    while inflight and (
+                        len(inflight) > 4 * self.max_workers
+                        or isinstance(inflight[0][3], str)
+                        or inflight[0][3].done()
+                    ):
+                        yield finish(inflight.popleft())
+                while inflight:
+                    yield finish(inflight.popleft())
+            if unchanged and next(existing_keys, None) is not None:
+                unchanged = False
+        except BaseException:
+            # Cancela o que ainda não começou; o que já está no checkpoint é retomado depois.
+            executor.shutdown(wait=False, cancel_futures=True)
+            writer.discard()
+            raise
+        finally:
+            lookup.close()
+        executor.shutdown()
+
+        if unchanged:
+            writer.discard()
+        else:
+            writer.commit()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        self.reused_contexts = total - generated
+        self.generated_contexts = generated
+        telemetry.add_cache("context", self.reused_contexts, self.generated_contexts)
+        if not unchanged:
+            # Só contextos do JSON anterior que não voltaram nesta execução (os do checkpoint não contam).
+            removed = max(existing_count - reused_existing, 0)
+            print(
+                f"Contextos de ponte: {self.reused_contexts} reaproveitados (chamadas ao LLM evitadas), "
+                f"{self.generated_contexts} gerados, {removed} removidos."
             )
-            results.append({
-                "chunk": current_chunk_text,
-                "context": contextualized_text
-            })
-            with open(json_path, 'w', encoding='utf-8') as fp:
-                json.dump(results, fp, ensure_ascii=False, indent=4)
-        return json_path
+
+    def generate_contexts(self) -> str:
+        """
+        Gera (ou atualiza) o JSON com o contexto de ponte de cada chunk e retorna o caminho.
+        Apenas chunks novos/alterados (e os vizinhos deles) vão para o LLM; ver iter_contexts.
+        """
+        for _ in self.iter_contexts():
+            pass
+        return self._json_path()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,178 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+
+import numpy as np
+
+# Cabeçalho .npy (formato 1.0) de tamanho fixo, para ser reescrito com a contagem final.
+_NPY_HEADER_SIZE = 128
+
+
+def _npy_header(count, dim):
+    header = repr({"descr": "<f4", "fortran_order": False, "shape": (count, dim)})
+    header = header.ljust(_NPY_HEADER_SIZE - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path):
+    """SHA-256 do conteúdo de `path`, lido em blocos de 1 MiB."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def select_in(conn, sql, keys, params=(), batch_size=500):
+    """
+    Linhas de `sql` para cada bloco de `keys` (sem repetições): `{placeholders}` no SQL vira
+    a lista de "?" do bloco e `params` vêm antes das chaves. Respeita o limite de variáveis
+    por consulta do SQLite.
+    """
+    keys = list(dict.fromkeys(keys))
+    for start in range(0, len(keys), batch_size):
+        batch = keys[start:start + batch_size]
+        yield from conn.execute(sql.format(placeholders=",".join("?" * len(batch))), [*params, *batch])
+
+
+def iter_batches(iterable, size):
+    """Listas de até `size` itens consumidas de `iterable` sob demanda."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class JsonArrayWriter:
+    """
+    Grava uma lista JSON com uma entrada por linha, em um arquivo temporário que só
+    substitui `path` em `commit`. O resultado continua sendo JSON válido (opcionalmente
+    dentro de {field: [...]}) e pode ser lido em streaming por `iter_json_array`.
+    """
+
+    def __init__(self, path, field=None):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.field = field
+        self.count = 0
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write(self.opening(field) + "\n")
+
+    @staticmethod
+    def opening(field):
+        return "[" if field is None else "{" + json.dumps(field) + ": ["
+
+    def write(self, entry):
+        self._file.write((",\n" if self.count else "") + json.dumps(entry, ensure_ascii=False))
+        self.count += 1
+
+    def commit(self):
+        self._file.write("\n]" + ("" if self.field is None else "}") + "\n")
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.tmp_path)
+
+
+def iter_json_array(path, field=None):
+    """
+    Entradas de um JSON gravado por JsonArrayWriter, lidas linha a linha. Arquivos em
+    outro layout (ex.: JSONs antigos com indent) são carregados por inteiro com json.load.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        if file.readline().rstrip("\n") == JsonArrayWriter.opening(field):
+            line = file.readline()
+            try:
+                first = None if line.startswith("]") else json.loads(line.rstrip().rstrip(","))
+            except json.JSONDecodeError:
+                # Mesma abertura, mas entradas em várias linhas (json.dump com indent).
+                line = None
+            if line is not None:
+                if first is None:
+                    return
+                yield first
+                for line in file:
+                    if line.startswith("]"):
+                        return
+                    yield json.loads(line.rstrip().rstrip(","))
+                return
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    yield from (data if field is None else data[field])
+
+
+class NpyAppender:
+    """
+    Grava uma matriz float32 em .npy em blocos de linhas, sem conhecer o total de
+    antemão: o cabeçalho é reescrito com a forma final em `commit`.
+    """
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.dim = dim
+        self.count = 0
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(_npy_header(0, dim))
+
+    def append(self, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimensão do embedding ({vectors.shape[1]}) difere da do índice ({self.dim})")
+        self._file.write(vectors.tobytes())
+        self.count += vectors.shape[0]
+
+    def commit(self):
+        self._file.seek(0)
+        self._file.write(_npy_header(self.count, self.dim))
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._file.close()
+        os.remove(self.tmp_path)
+
+
+class DiskLookup:
+    """
+    Mapa chave -> valor JSON em um SQLite temporário, para consultas durante a ingestão
+    sem manter o índice anterior inteiro em memória. O arquivo é apagado em `close`.
+    """
+
+    def __init__(self, directory):
+        fd, self.path = tempfile.mkstemp(prefix="lookup-", suffix=".sqlite", dir=directory)
+        os.close(fd)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.count = 0
+
+    def put_many(self, items):
+        rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in items]
+        self._conn.executemany("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", rows)
+        self.count += len(rows)
+
+    def get(self, key):
+        row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def get_many(self, keys):
+        rows = select_in(self._conn, "SELECT key, value FROM entries WHERE key IN ({placeholders})", keys)
+        return {key: json.loads(value) for key, value in rows}
+
+    def close(self):
+        self._conn.close()
+        os.remove(self.path)
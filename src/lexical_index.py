@@ -0,0 +1,167 @@
+import threading
+from collections import Counter
+
+import numpy as np
+
+from .rerankers import tokenize
+from .vector_index import top_k
+
+# Versão do formato de lexical_index.npz.
+LEXICAL_FORMAT_VERSION = 1
+
+
+class LexicalIndex:
+    """
+    Índice invertido BM25 sobre o texto dos chunks (conteúdo + contexto de ponte).
+    Cada documento é identificado pela mesma chave de conteúdo do SimpleVectorDB
+    (`embedding_key`), então uma reindexação só tokeniza os chunks novos ou alterados.
+    As listas invertidas ficam em arrays NumPy ordenados por termo e são reconstruídas
+    sob demanda depois de cada atualização.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        # Uma entrada por linha do SimpleVectorDB: chave do conteúdo e (ids dos termos, frequências).
+        self.keys = []
+        self.doc_terms = []
+        self._bounds = None
+        self._postings_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _encode(self, text):
+        counts = Counter(tokenize(text))
+        term_ids = [self.vocabulary.setdefault(term, len(self.vocabulary)) for term in counts]
+        return np.array(term_ids, dtype=np.int32), np.array(list(counts.values()), dtype=np.int32)
+
+    def update(self, keys, texts):
+        """
+        Alinha o índice a `keys` (na ordem das linhas do índice vetorial). Documentos
+        inalterados são reaproveitados; só os textos de chaves novas são tokenizados.
+        `texts` pode ser um iterável preguiçoso: é consumido em paralelo a `keys`.
+        Retorna quantos documentos foram tokenizados.
+        """
+        terms_by_key = dict(zip(self.keys, self.doc_terms))
+        doc_terms = []
+        tokenized = 0
+        for key, text in zip(keys, texts):
+            terms = terms_by_key.get(key)
+            if terms is None:
+                terms = self._encode(text)
+                tokenized += 1
+            doc_terms.append(terms)
+        self.keys = list(keys)
+        self.doc_terms = doc_terms
+        self._bounds = None
+        return tokenized
+
+    def _flat_terms(self):
+        if not self.doc_terms:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return (
+            np.concatenate([term_ids for term_ids, _ in self.doc_terms]),
+            np.concatenate([freqs for _, freqs in self.doc_terms]),
+        )
+
+    def ensure_postings(self):
+        """
+        Monta as listas invertidas se ainda não existirem. Threads concorrentes esperam a
+        mesma construção; o servidor chama isto antes do fork para compartilhá-las.
+        """
+        if self._bounds is None:
+            with self._postings_lock:
+                if self._bounds is None:
+                    self._build_postings()
+
+    def _build_postings(self):
+        count = len(self.doc_terms)
+        lengths = np.array([len(term_ids) for term_ids, _ in self.doc_terms], dtype=np.int64)
+        term_ids, freqs = self._flat_terms()
+        freqs = freqs.astype(np.float32)
+        rows = np.repeat(np.arange(count), lengths)
+
+        order = np.argsort(term_ids, kind="stable")
+        bounds = np.searchsorted(term_ids[order], np.arange(len(self.vocabulary) + 1))
+        doc_freqs = np.diff(bounds)
+        doc_lengths = np.bincount(rows, weights=freqs, minlength=count)
+        avg_length = float(doc_lengths.mean()) if count else 0.0
+
+        self._rows = rows[order]
+        self._freqs = freqs[order]
+        self._idf = np.log(1 + (count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        # Denominador do BM25 por documento: k1 * (1 - b + b * |d| / avgdl).
+        self._norms = (self.k1 * (1 - self.b + self.b * doc_lengths / (avg_length or 1.0))).astype(np.float32)
+        # Atribuído por último: buscas concorrentes só usam as listas quando tudo está pronto.
+        self._bounds = bounds
+
+    def scores(self, query):
+        """Score BM25 de cada documento para `query` (0 para quem não tem nenhum termo)."""
+        self.ensure_postings()
+        bounds = self._bounds
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None or term_id + 1 >= len(bounds):
+                continue
+            start, end = bounds[term_id], bounds[term_id + 1]
+            rows, freqs = self._rows[start:end], self._freqs[start:end]
+            scores[rows] += self._idf[term_id] * freqs * (self.k1 + 1) / (freqs + self._norms[rows])
+        return scores
+
+    def search(self, query, k, mask=None):
+        """
+        Retorna (índices, scores) dos k documentos com maior BM25 positivo, em ordem decrescente.
+        Com `mask`, só as linhas True são consideradas.
+        """
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0
+        best = top_k(scores, min(k, int(np.count_nonzero(scores))))
+        return best, scores[best]
+
+    def save(self, path):
+        term_ids, freqs = self._flat_terms()
+        lengths = [len(ids) for ids, _ in self.doc_terms]
+        with open(path, "wb") as file:
+            np.savez(
+                file,
+                format_version=LEXICAL_FORMAT_VERSION,
+                params=np.array([self.k1, self.b]),
+                keys=np.array(self.keys, dtype=str),
+                vocabulary=np.array(list(self.vocabulary), dtype=str),
+                offsets=np.cumsum([0] + lengths),
+                term_ids=term_ids,
+                freqs=freqs,
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["format_version"]) != LEXICAL_FORMAT_VERSION:
+                raise ValueError(f"Versão de índice lexical não suportada em {path}: {data['format_version']}")
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            index.keys = data["keys"].tolist()
+            index.vocabulary = {term: term_id for term_id, term in enumerate(data["vocabulary"].tolist())}
+            offsets, term_ids, freqs = data["offsets"], data["term_ids"], data["freqs"]
+        index.doc_terms = [
+            (term_ids[start:end], freqs[start:end]) for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        return index
+
+
+def reciprocal_rank_fusion(rankings, rrf_k):
+    """
+    Funde listas de índices (cada uma em ordem decrescente de relevância) pela soma de
+    1 / (rrf_k + posição). Retorna (índices, scores) em ordem decrescente; empates
+    mantêm a ordem de primeira aparição.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, start=1):
+            fused[int(idx)] = fused.get(int(idx), 0.0) + 1.0 / (rrf_k + rank)
+    order = sorted(fused, key=lambda idx: -fused[idx])
+    return np.array(order, dtype=np.intp), np.array([fused[idx] for idx in order])
@@ -0,0 +1,153 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from .configs import RERANK_BACKEND, RERANK_COHERE_MODEL, RERANK_CROSS_ENCODER_MODEL
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Diacríticos combinantes que sobram da decomposição NFKD.
+_COMBINING_PATTERN = re.compile(r"[\u0300-\u036f]")
+
+
+def tokenize(text):
+    """Tokens em minúsculas e sem acentos ("Capitú" e "capitu" viram o mesmo termo)."""
+    text = _COMBINING_PATTERN.sub("", unicodedata.normalize("NFKD", text.lower()))
+    return _TOKEN_PATTERN.findall(text)
+
+
+class Reranker:
+    """
+    Interface dos rerankers do SimpleVectorDB. `rerank` recebe a query e os textos dos
+    candidatos e devolve pares (posição do candidato em `documents`, score) em ordem
+    decrescente de relevância, com no máximo `top_n` itens.
+    """
+
+    name = None
+
+    def rerank(self, query, documents, top_n):
+        raise NotImplementedError
+
+
+class CohereReranker(Reranker):
+    """
+    Rerank via API da Cohere. O cliente é criado na primeira chamada e reutilizado (a
+    conexão HTTP fica no pool do cliente), e os resultados voltam pela posição do documento.
+    """
+
+    name = "cohere"
+
+    def __init__(self, client=None, api_key=None, model=RERANK_COHERE_MODEL):
+        self.client = client
+        self.api_key = api_key
+        self.model = model
+        self._client_lock = threading.Lock()
+
+    def _get_client(self):
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    api_key = self.api_key or os.getenv("COHERE_API_KEY")
+                    if not api_key:
+                        raise ValueError("COHERE_API_KEY não definida para o rerank com a Cohere.")
+                    import cohere
+
+                    self.client = cohere.Client(api_key)
+        return self.client
+
+    def rerank(self, query, documents, top_n):
+        response = self._get_client().rerank(
+            query=query,
+            documents=list(documents),
+            top_n=min(top_n, len(documents)),
+            model=self.model,
+        )
+        return [(result.index, float(result.relevance_score)) for result in response.results]
+
+
+class BM25Reranker(Reranker):
+    """
+    Rerank lexical BM25 em processo, sem rede e determinístico. As estatísticas (IDF e
+    tamanho médio) são calculadas sobre os próprios candidatos, o que basta para reordenar
+    o pequeno conjunto devolvido pela busca vetorial.
+    """
+
+    name = "bm25"
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+
+    def rerank(self, query, documents, top_n):
+        doc_terms = [Counter(tokenize(document)) for document in documents]
+        doc_lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+        idf = {}
+        for term in set(tokenize(query)):
+            doc_freq = sum(1 for terms in doc_terms if term in terms)
+            if doc_freq:
+                idf[term] = math.log(1 + (len(doc_terms) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        scores = []
+        for terms, length in zip(doc_terms, doc_lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length) if avg_length else self.k1
+            scores.append(sum(
+                weight * terms[term] * (self.k1 + 1) / (terms[term] + norm)
+                for term, weight in idf.items() if term in terms
+            ))
+
+        # Empates mantêm a ordem da busca vetorial.
+        order = sorted(range(len(documents)), key=lambda i: -scores[i])
+        return [(i, scores[i]) for i in order[:top_n]]
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Rerank com um cross-encoder pequeno rodando na CPU (extra opcional `rerank-local`,
+    que instala o sentence-transformers). O modelo é carregado na primeira chamada.
+    """
+
+    name = "cross-encoder"
+
+    def __init__(self, model=RERANK_CROSS_ENCODER_MODEL, device="cpu", batch_size=32):
+        self.model_name = model
+        self.device = device
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                    except ImportError as e:
+                        raise ImportError(
+                            "O reranker 'cross-encoder' requer o extra opcional: pip install .[rerank-local]"
+                        ) from e
+                    self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def rerank(self, query, documents, top_n):
+        scores = self._get_model().predict(
+            [(query, document) for document in documents], batch_size=self.batch_size
+        )
+        order = sorted(range(len(documents)), key=lambda i: -scores[i])
+        return [(i, float(scores[i])) for i in order[:top_n]]
+
+
+RERANKERS = {
+    CohereReranker.name: CohereReranker,
+    BM25Reranker.name: BM25Reranker,
+    CrossEncoderReranker.name: CrossEncoderReranker,
+}
+
+
+def create_reranker(backend=RERANK_BACKEND, **params):
+    if backend not in RERANKERS:
+        raise ValueError(f"Reranker desconhecido: {backend} (opções: {', '.join(RERANKERS)})")
+    return RERANKERS[backend](**params)
@@ -0,0 +1,57 @@
+"""
+Ponto de entrada só de busca: abre um índice já gerado (data/{nome}/) e responde buscas
+sem carregar LangGraph, LangChain, tiktoken nem os clientes de LLM e de rerank. O
+cliente de embeddings da OpenAI é criado na primeira query que não está no cache de
+embeddings. Serve para processos de worker e chamadas de linha de comando.
+
+Uso (na raiz do projeto):
+    python -m src.search "Quem é José Dias?" --name Dom_Casmurro -k 5
+"""
+import os
+
+from .simple_vectorDB import SimpleVectorDB
+from .configs import INDEX_BACKEND, SIMILARITY_THRESHOLD, USE_HYBRID
+
+
+def open_index(name, data_dir="data", client=None, embedding_cache=None, index_backend=INDEX_BACKEND, **index_params):
+    """SimpleVectorDB de um índice existente, pronto para buscar (nada é ingerido aqui)."""
+    db_dir = os.path.join(data_dir, name)
+    if not os.path.exists(os.path.join(db_dir, "header.json")) and not os.path.exists(os.path.join(db_dir, "vector_db.pkl")):
+        raise FileNotFoundError(
+            f"Índice '{name}' não encontrado em {db_dir}; gere-o antes com o Agent ou o CollectionManager."
+        )
+    vector_db = SimpleVectorDB(name=name, client=client, embedding_cache=embedding_cache, index_backend=index_backend,
+                               data_dir=data_dir, **index_params)
+    vector_db.load_db()
+    return vector_db
+
+
+def search(vector_db, query, k=3, similarity_threshold=SIMILARITY_THRESHOLD, use_rerank=False,
+           use_hybrid=USE_HYBRID, documents=None):
+    """Busca em um índice aberto por open_index (rerank só importa o backend se pedido)."""
+    return vector_db.search(
+        query, k=k, similarity_threshold=similarity_threshold, use_rerank=use_rerank, rerank_top_n=k,
+        use_hybrid=use_hybrid, documents=documents,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Busca em um índice existente, sem carregar o agente.")
+    parser.add_argument("queries", nargs="+")
+    parser.add_argument("--name", default="Dom_Casmurro")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--rerank", action="store_true")
+    parser.add_argument("--hybrid", action="store_true", default=USE_HYBRID)
+    parser.add_argument("--index-backend", default=INDEX_BACKEND)
+    args = parser.parse_args()
+
+    vector_db = open_index(args.name, data_dir=args.data_dir, index_backend=args.index_backend)
+    for query in args.queries:
+        results = search(vector_db, query, k=args.k, similarity_threshold=args.threshold, use_rerank=args.rerank,
+                         use_hybrid=args.hybrid)
+        print(json.dumps({"query": query, "results": results}, ensure_ascii=False, indent=2))
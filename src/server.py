@@ -0,0 +1,368 @@
+"""
+Servidor HTTP de busca com pré-fork. O processo pai abre o índice (embeddings.npy via
+memmap somente leitura), constrói o backend de busca e o BM25 e só então cria os workers
+com fork: todos compartilham as mesmas páginas da matriz (page cache / copy-on-write sem
+escrita), então a memória não cresce por worker. Cada worker atende conexões em threads e
+junta as buscas que chegam ao mesmo tempo em uma única chamada de search_batch (um lote
+de embeddings e um produto matriz-matriz), até SERVER_MAX_BATCH queries por lote.
+
+Endpoints (JSON):
+    POST /search  {"query": "...", "k": 3, "similarity_threshold": 0.2, "use_rerank": false,
+                   "use_hybrid": false, "documents": null}  (ou "queries": [...] para um lote pronto)
+    POST /query   {"query": "..."} -> resposta do Agent (só com --doc)
+    GET  /health  estado e estatísticas de lote do worker que atendeu
+    GET  /metrics telemetria do worker que atendeu (formato Prometheus)
+
+Uso (na raiz do projeto):
+    python -m src.server --name Dom_Casmurro --workers 4 --port 8000
+    python -m src.server --doc src/data/Dom_Casmurro.txt --workers 2
+"""
+import gc
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .embedding_cache import EmbeddingCache
+from .search import open_index
+from .telemetry import telemetry
+from .configs import (SERVER_WORKERS, SERVER_MAX_BATCH, SERVER_BATCH_WAIT_MS, SERVER_RESTART_DELAY, SERVER_MAX_FAST_FAILURES,
+                      SERVER_FAST_FAILURE_SECONDS, SIMILARITY_THRESHOLD, USE_HYBRID)
+
+
+class SearchBatcher:
+    """
+    Fila de buscas de um worker. Uma thread retira a primeira busca pendente, junta as que
+    já estão na fila (ou chegam em até `wait_ms`) com os mesmos parâmetros e resolve todas
+    com uma chamada de search_batch. Sem concorrência o lote tem uma query e nada espera.
+    """
+
+    def __init__(self, vector_db, max_batch=SERVER_MAX_BATCH, wait_ms=SERVER_BATCH_WAIT_MS):
+        self.vector_db = vector_db
+        self.max_batch = max_batch
+        self.wait_ms = wait_ms
+        self.batches = 0
+        self.queries = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="search-batcher", daemon=True)
+        self._thread.start()
+
+    def search(self, query, k=3, similarity_threshold=SIMILARITY_THRESHOLD, use_rerank=False,
+               use_hybrid=USE_HYBRID, documents=None):
+        """Resultados de `query`; bloqueia até o lote em que ela entrou terminar."""
+        params = (k, similarity_threshold, use_rerank, use_hybrid, tuple(documents) if documents is not None else None)
+        item = {"query": query, "params": params, "done": threading.Event(), "results": None, "error": None}
+        self._queue.put(item)
+        item["done"].wait()
+        if item["error"] is not None:
+            raise item["error"]
+        return item["results"]
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        deadline = time.monotonic() + self.wait_ms / 1000
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                pending.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return pending
+
+    def _run(self):
+        while True:
+            pending = self._collect()
+            try:
+                groups = {}
+                for item in pending:
+                    groups.setdefault(item["params"], []).append(item)
+            except Exception as error:
+                # Um pedido malformado não pode derrubar a thread: quem estava no lote recebe o erro.
+                self._finish(pending, error=error)
+                continue
+            for (k, similarity_threshold, use_rerank, use_hybrid, documents), items in groups.items():
+                try:
+                    results = self.vector_db.search_batch(
+                        [item["query"] for item in items], k=k, similarity_threshold=similarity_threshold,
+                        use_rerank=use_rerank, rerank_top_n=k, use_hybrid=use_hybrid,
+                        documents=list(documents) if documents is not None else None,
+                    )
+                    self._finish(items, results=results)
+                except Exception as error:
+                    self._finish(items, error=error)
+
+    def _finish(self, items, results=None, error=None):
+        if results is not None:
+            for item, item_results in zip(items, results):
+                item["results"] = item_results
+        else:
+            for item in items:
+                item["error"] = error
+        self.batches += 1
+        self.queries += len(items)
+        for item in items:
+            item["done"].set()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch": self.queries / self.batches if self.batches else 0.0,
+        }
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive: o cliente reaproveita a conexão entre requisições.
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok", "pid": os.getpid(), "rows": self.server.vector_db._size,
+                **self.server.batcher.stats(),
+            })
+        elif self.path == "/metrics":
+            self._send(200, telemetry.to_prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"rota desconhecida: {self.path}"})
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except ValueError as error:
+            self._send_json(400, {"error": f"JSON inválido: {error}"})
+            return
+        try:
+            if self.path == "/search":
+                self._send_json(200, self._search(request))
+            elif self.path == "/query":
+                self._send_json(200, self._query(request))
+            else:
+                self._send_json(404, {"error": f"rota desconhecida: {self.path}"})
+        except KeyError as error:
+            self._send_json(400, {"error": f"campo obrigatório ausente: {error}"})
+        except (TypeError, ValueError) as error:
+            self._send_json(400, {"error": str(error)})
+        except RuntimeError as error:
+            # Ex.: o documento do /query mudou e os workers não regeram o índice compartilhado.
+            self._send_json(503, {"error": str(error)})
+        except Exception as error:
+            self._send_json(500, {"error": str(error)})
+
+    def _search(self, request):
+        params = {
+            "k": int(request.get("k", 3)),
+            "similarity_threshold": float(request.get("similarity_threshold", SIMILARITY_THRESHOLD)),
+            "use_rerank": bool(request.get("use_rerank", False)),
+            "use_hybrid": bool(request.get("use_hybrid", USE_HYBRID)),
+            "documents": request.get("documents"),
+        }
+        documents = params["documents"]
+        if documents is not None and (not isinstance(documents, list)
+                                      or not all(isinstance(document, str) for document in documents)):
+            raise ValueError("'documents' deve ser null ou uma lista de nomes de documento")
+        if "queries" in request:
+            # Lote montado pelo cliente: vai direto para search_batch.
+            queries = [str(query) for query in request["queries"]]
+            results = self.server.vector_db.search_batch(queries, rerank_top_n=params["k"], **params)
+            return {"results": results}
+        return {"results": self.server.batcher.search(str(request["query"]), **params)}
+
+    def _query(self, request):
+        agent = self.server.get_agent()
+        if agent is None:
+            raise ValueError("o servidor foi iniciado sem --doc; /query não está disponível")
+        final_state = agent.invoke(str(request["query"]))
+        return {
+            "answer": final_state["messages"][-1].content,
+            "sources": final_state.get("sources", []),
+            "context_packing": final_state.get("context_packing"),
+            "answer_cache": final_state.get("answer_cache"),
+        }
+
+
+class SearchServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer de um worker sobre o socket de escuta herdado do processo pai."""
+
+    daemon_threads = True
+
+    def __init__(self, listen_socket, vector_db, batcher, doc_path=None, data_dir="data"):
+        super().__init__(listen_socket.getsockname()[:2], SearchRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listen_socket
+        self.server_address = listen_socket.getsockname()[:2]
+        self.vector_db = vector_db
+        self.batcher = batcher
+        self.doc_path = doc_path
+        self.data_dir = data_dir
+        self._agent = None
+        self._agent_lock = threading.Lock()
+
+    def get_agent(self):
+        """
+        Agent do worker, criado na primeira /query sobre o mesmo índice compartilhado do /search.
+        É somente leitura: só o processo pai ingere, antes do fork.
+        """
+        if self.doc_path is None:
+            return None
+        with self._agent_lock:
+            if self._agent is None:
+                from .agent import Agent
+
+                self._agent = Agent(doc_path=self.doc_path, vector_db=self.vector_db, data_dir=self.data_dir,
+                                    read_only=True)
+            return self._agent
+
+
+def _run_worker(listen_socket, vector_db, doc_path, data_dir, max_batch, wait_ms):
+    # Conexões SQLite não atravessam fork: cada worker abre a sua no mesmo arquivo de cache.
+    cache = vector_db.embedding_cache
+    vector_db.embedding_cache = EmbeddingCache(path=cache.path, max_entries=cache.max_entries)
+    telemetry.reset()
+    server = SearchServer(listen_socket, vector_db, SearchBatcher(vector_db, max_batch, wait_ms), doc_path,
+                          data_dir)
+    server.serve_forever()
+
+
+def serve(vector_db, host="127.0.0.1", port=8000, workers=SERVER_WORKERS, doc_path=None, data_dir="data",
+          max_batch=SERVER_MAX_BATCH, wait_ms=SERVER_BATCH_WAIT_MS, ready=None):
+    """
+    Atende `vector_db` (já carregado) em host:port com `workers` processos (0 = um por CPU).
+    Bloqueia até SIGINT/SIGTERM. Workers que terminam com erro são recriados com espera
+    crescente; após SERVER_MAX_FAST_FAILURES falhas rápidas seguidas o servidor desiste.
+    `ready`, se dado, é chamado com o endereço de escuta depois que o socket está aberto.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Tudo o que é só leitura fica pronto antes do fork, para ser compartilhado.
+    vector_db._get_index()
+    vector_db._get_document_rows()
+    if os.path.exists(vector_db.lexical_path) or USE_HYBRID:
+        # As listas invertidas do BM25 também: senão cada worker montaria uma cópia própria.
+        vector_db._get_lexical_index().ensure_postings()
+
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(1024)
+    address = listen_socket.getsockname()[:2]
+    print(f"Servidor em http://{address[0]}:{address[1]} com {workers} worker(s), {vector_db._size} vetores.")
+    if ready is not None:
+        ready(address)
+
+    if workers == 1 or not hasattr(os, "fork"):
+        _run_worker(listen_socket, vector_db, doc_path, data_dir, max_batch, wait_ms)
+        return
+
+    # Objetos criados até aqui não são mais visitados pelo GC, que senão tocaria (e copiaria) suas páginas.
+    gc.freeze()
+    children = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            status = 0
+            try:
+                _run_worker(listen_socket, vector_db, doc_path, data_dir, max_batch, wait_ms)
+            except BaseException:
+                traceback.print_exc()
+                sys.stderr.flush()
+                status = 1
+            finally:
+                os._exit(status)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    fast_failures = 0
+    gave_up = False
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = children.pop(pid)
+        if stopping:
+            continue
+        if os.waitstatus_to_exitcode(status) == 0:
+            print(f"Worker {pid} terminou sem erro; não será recriado.")
+            continue
+        fast_failures = fast_failures + 1 if time.monotonic() - started < SERVER_FAST_FAILURE_SECONDS else 1
+        if fast_failures >= SERVER_MAX_FAST_FAILURES:
+            print(f"Worker {pid} falhou ({fast_failures} falhas rápidas seguidas); encerrando o servidor.")
+            gave_up = True
+            stop(None, None)
+            continue
+        delay = SERVER_RESTART_DELAY * 2 ** (fast_failures - 1)
+        print(f"Worker {pid} falhou (código {os.waitstatus_to_exitcode(status)}); iniciando outro em {delay:.1f}s.")
+        time.sleep(delay)
+        if not stopping:
+            spawn()
+    listen_socket.close()
+    if gave_up:
+        raise RuntimeError("workers do servidor falharam repetidamente; veja os tracebacks acima")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Servidor HTTP de busca com workers pré-fork.")
+    parser.add_argument("--name", help="Índice em data/{name}/ (padrão: nome do --doc).")
+    parser.add_argument("--doc", help="Documento do Agent: gera o índice se preciso e habilita POST /query.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--max-batch", type=int, default=SERVER_MAX_BATCH)
+    parser.add_argument("--batch-wait-ms", type=float, default=SERVER_BATCH_WAIT_MS)
+    args = parser.parse_args()
+    if not args.name and not args.doc:
+        parser.error("informe --name ou --doc")
+
+    if args.doc:
+        from .agent import Agent
+
+        # Ingestão (se o documento mudou) uma única vez, no pai; os workers só abrem o índice.
+        Agent(doc_path=args.doc, data_dir=args.data_dir)._get_vector_db()
+    vector_db = open_index(args.name or Path(args.doc).stem, data_dir=args.data_dir)
+    serve(vector_db, args.host, args.port, args.workers, args.doc, args.data_dir, args.max_batch, args.batch_wait_ms)
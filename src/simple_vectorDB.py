@@ -1,167 +1,605 @@
 import os
 import json
 import pickle
-import cohere
-from cohere import Client as CohereClient 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import openai 
-from tqdm import tqdm 
 from dotenv import load_dotenv
 
+from .embedding_cache import EmbeddingCache
+from .vector_index import create_index
+from .rerankers import create_reranker
+from .lexical_index import LexicalIndex, reciprocal_rank_fusion
+from .telemetry import telemetry, usage_cost
+from .ingestion import DiskLookup, JsonArrayWriter, NpyAppender, chunk_hash, iter_batches, iter_json_array
+from .configs import INDEX_BACKEND, HYBRID_CANDIDATES, RRF_K, INGEST_BATCH_SIZE
 
 
 load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
-co = cohere.Client("COHERE_API_KEY") 
+
+# Versão do formato em disco (header.json + embeddings.npy + metadata.json).
+DB_FORMAT_VERSION = 1
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Máximo de chamadas simultâneas de rerank em search_batch.
+RERANK_MAX_WORKERS = 8
 
 class SimpleVectorDB:
-    def __init__(self, name, api_key=None): 
+    def __init__(self, name, api_key=None, client=None, embedding_cache=None, reranker=None, index_backend=INDEX_BACKEND,
+                 data_dir="data", **index_params): 
         self.name = name
-        self.embeddings = []
+        # Matriz float32 contígua com vetores L2-normalizados; apenas as primeiras
+        # `_size` linhas são válidas (o restante é capacidade pré-alocada).
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._size = 0
+        # Backend de busca (exato ou ANN), reconstruído sob demanda quando os vetores mudam.
+        self.index = create_index(index_backend, **index_params)
+        self._index_stale = True
+        # Reranker (ver rerankers.py); criado no primeiro rerank se não for injetado.
+        self.reranker = reranker
+        # Índice BM25 para a busca híbrida, alinhado às linhas de `metadata` sob demanda.
+        self.lexical_index = None
+        self._lexical_stale = True
         self.metadata = []
-        self.query_cache = {}
-        self.db_path = f"data/{name}/vector_db.pkl"
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True) 
+        # Linhas de cada documento (campo "document" dos metadados), para os filtros de busca.
+        self._document_rows = None
+        # Cache de embeddings em disco compartilhado entre índices, queries e HyDE.
+        self.embedding_cache = embedding_cache if embedding_cache is not None else EmbeddingCache()
+        self.db_dir = os.path.join(data_dir, name)
+        self.header_path = os.path.join(self.db_dir, "header.json")
+        self.embeddings_path = os.path.join(self.db_dir, "embeddings.npy")
+        self.metadata_path = os.path.join(self.db_dir, "metadata.json")
+        self.lexical_path = os.path.join(self.db_dir, "lexical_index.npz")
+        self.legacy_db_path = os.path.join(self.db_dir, "vector_db.pkl")
+        os.makedirs(self.db_dir, exist_ok=True) 
         self.total_tokens_used = 0 
         self.total_cost = 0.0
-        self.client = openai.OpenAI(api_key=api_key if api_key else openai_api_key)
+        # Identifica a origem indexada (ex.: hash do documento); gravado no header.
+        self.source_signature = None
+        # Cliente de embeddings; o da OpenAI só é importado e criado na primeira chamada à API.
+        self.client = client
+        self.api_key = api_key
+        self._client_lock = threading.Lock()
+        self.reused_embeddings = 0
+        self.embedded_chunks = 0
 
+    @staticmethod
+    def combined_text(chunk, context):
+        return f"Conteúdo do Chunk:\n{chunk}\n\nContexto Adjacente Gerado:\n{context}"
 
     def load_data(self, json_data):
-        if os.path.exists(self.db_path):
-            self.load_db()
-            return
-
-        texts_for_embedding = []
-        for item in json_data:
-            combined_text = f"Conteúdo do Chunk:\n{item['chunk']}\n\nContexto Adjacente Gerado:\n{item['context']}"
-            texts_for_embedding.append(combined_text)
-        
+        """
+        Indexa os chunks do JSON de contextos. Com um índice já salvo em disco, apenas os
+        textos combinados novos ou alterados (pelo hash do conteúdo) vão para a API de
+        embeddings; os vetores inalterados são reaproveitados e chunks removidos são descartados.
+        """
+        texts_for_embedding = [self.combined_text(item["chunk"], item["context"]) for item in json_data]
+        keys = [chunk_hash(text) for text in texts_for_embedding]
         metadata = [
             {
                 "chunk_content": item["chunk"],
                 "context": item["context"],     
-                "original_index": idx
+                "original_index": idx,
+                "embedding_key": keys[idx]
             }
             for idx, item in enumerate(json_data)
         ]
-        self._embed_and_store(texts_for_embedding, metadata)
+
+        if os.path.exists(self.header_path) or os.path.exists(self.legacy_db_path):
+            self.load_db()
+        stored_keys = self._stored_keys()
+        if stored_keys == keys:
+            self.reused_embeddings, self.embedded_chunks = len(keys), 0
+            if not os.path.exists(self.lexical_path):
+                self._write_atomic(self.lexical_path, self._get_lexical_index().save)
+            return
+
+        row_by_key = {key: row for row, key in enumerate(stored_keys)}
+        reused = [idx for idx, key in enumerate(keys) if key in row_by_key]
+        missing = [idx for idx, key in enumerate(keys) if key not in row_by_key]
+        new_vectors = self._embed_texts([texts_for_embedding[idx] for idx in missing])
+
+        dim = new_vectors.shape[1] if missing else self._matrix.shape[1]
+        vectors = np.empty((len(keys), dim), dtype=np.float32)
+        if reused:
+            vectors[reused] = self.embeddings[[row_by_key[keys[idx]] for idx in reused]]
+        if missing:
+            vectors[missing] = new_vectors
+
+        self._set_embeddings(vectors)
+        self.metadata = metadata
+        self._document_rows = None
+        self._lexical_stale = True
+        self.source_signature = None
+        self.reused_embeddings = len(reused)
+        self.embedded_chunks = len(missing)
+        removed = len(set(stored_keys) - set(keys))
+        print(
+            f"Índice '{self.name}': {self.reused_embeddings} embeddings reaproveitados (chamadas à API evitadas), "
+            f"{self.embedded_chunks} gerados, {removed} removidos."
+        )
         self.save_db()
         
-    def _embed_and_store(self, texts, metadata):
+    def read_header(self):
+        """Conteúdo do header.json do índice em disco, ou None se ainda não houver índice."""
+        if not os.path.exists(self.header_path):
+            return None
+        with open(self.header_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _read_supported_header(self):
+        """Como read_header, mas recusa índices gravados em outra versão do formato."""
+        header = self.read_header()
+        if header is not None and header.get("format_version") != DB_FORMAT_VERSION:
+            raise ValueError(
+                f"Versão de índice não suportada em {self.header_path}: {header.get('format_version')}"
+            )
+        return header
+
+    def _open_previous_index(self):
+        """
+        Vetores (memmap) do índice já salvo e um DiskLookup chave -> linha, para reaproveitar
+        embeddings na ingestão em streaming sem carregar o índice anterior na memória.
+        """
+        if not os.path.exists(self.header_path) and os.path.exists(self.legacy_db_path):
+            self.migrate_legacy_db()
+            self._reset_embeddings()
+            self.metadata = []
+        header = self._read_supported_header()
+        if header is None or not header["count"]:
+            return header, None, None
+        vectors = np.load(self.embeddings_path, mmap_mode="r")
+        lookup = DiskLookup(self.db_dir)
+        rows = enumerate(self._iter_stored_keys())
+        for batch in iter_batches(((key, row) for row, key in rows), 1000):
+            lookup.put_many(batch)
+        return header, vectors, lookup
+
+    def _iter_stored_keys(self):
+        for meta in iter_json_array(self.metadata_path, "metadata"):
+            yield meta.get("embedding_key") or chunk_hash(self.combined_text(meta["chunk_content"], meta["context"]))
+
+    def _iter_stored_rows(self):
+        """(chave, documento) de cada linha do índice em disco."""
+        keys = self._iter_stored_keys()
+        for key, meta in zip(keys, iter_json_array(self.metadata_path, "metadata")):
+            yield key, meta.get("document")
+
+    def ingest_stream(self, entries, batch_size=INGEST_BATCH_SIZE, source_signature=None):
+        """
+        Indexa um iterável de entradas {chunk, context} (ex.: ContextGenerator.iter_contexts)
+        em lotes de `batch_size`, gravando embeddings.npy e metadata.json direto em disco:
+        a memória fica limitada a um lote, qualquer que seja o tamanho do corpus.
+        Vetores de chunks já indexados são lidos do índice anterior via memmap; só os textos
+        novos vão para o cache de embeddings/API. Se nada mudou, os arquivos atuais são mantidos.
+        Entradas com o campo "document" o levam aos metadados (filtro `documents` da busca).
+        Ao final o índice está em disco; use load_db para buscar.
+        """
+        header, previous_vectors, lookup = self._open_previous_index()
+        if header is not None:
+            self.total_tokens_used = header.get("total_tokens_used", 0)
+            self.total_cost = header.get("total_cost", 0.0)
+        previous_rows = self._iter_stored_rows() if lookup is not None else iter(())
+        unchanged = lookup is not None
+
+        vectors_writer = None
+        metadata_writer = JsonArrayWriter(self.metadata_path, field="metadata")
+        reused = embedded = 0
+        try:
+            for batch in iter_batches(entries, batch_size):
+                texts = [self.combined_text(item["chunk"], item["context"]) for item in batch]
+                keys = [chunk_hash(text) for text in texts]
+                # O documento faz parte da linha: mover um chunk entre documentos também é mudança.
+                if unchanged and any(
+                    next(previous_rows, None) != (key, item.get("document")) for item, key in zip(batch, keys)
+                ):
+                    unchanged = False
+                rows = lookup.get_many(keys) if lookup is not None else {}
+                missing = [i for i, key in enumerate(keys) if key not in rows]
+                new_vectors = self._embed_texts([texts[i] for i in missing])
+
+                if vectors_writer is None:
+                    dim = previous_vectors.shape[1] if previous_vectors is not None else new_vectors.shape[1]
+                    vectors_writer = NpyAppender(self.embeddings_path, dim)
+                vectors = np.empty((len(batch), vectors_writer.dim), dtype=np.float32)
+                found = [i for i, key in enumerate(keys) if key in rows]
+                if found:
+                    vectors[found] = previous_vectors[[rows[keys[i]] for i in found]]
+                if missing:
+                    vectors[missing] = new_vectors
+                vectors_writer.append(vectors)
+
+                for item, key in zip(batch, keys):
+                    meta = {
+                        "chunk_content": item["chunk"],
+                        "context": item["context"],
+                        "original_index": metadata_writer.count,
+                        "embedding_key": key,
+                    }
+                    if "document" in item:
+                        meta["document"] = item["document"]
+                    metadata_writer.write(meta)
+                reused += len(found)
+                embedded += len(missing)
+            if unchanged and next(previous_rows, None) is not None:
+                unchanged = False
+        except BaseException:
+            metadata_writer.discard()
+            if vectors_writer is not None:
+                vectors_writer.discard()
+            raise
+        finally:
+            if lookup is not None:
+                lookup.close()
+        previous_vectors = None
+
+        self.reused_embeddings, self.embedded_chunks = reused, embedded
+        self.source_signature = source_signature
+        if unchanged:
+            metadata_writer.discard()
+            vectors_writer.discard()
+            self._write_header(header["count"], header["dim"])
+            return
+
+        if vectors_writer is None:
+            vectors_writer = NpyAppender(self.embeddings_path, header["dim"] if header else 0)
+        vectors_writer.commit()
+        metadata_writer.commit()
+        self._write_header(vectors_writer.count, vectors_writer.dim)
+        removed = max((header["count"] if header else 0) - reused, 0)
+        print(
+            f"Índice '{self.name}': {reused} embeddings reaproveitados (chamadas à API evitadas), "
+            f"{embedded} gerados, {removed} removidos."
+        )
+
+    def build_lexical_index(self):
+        """Atualiza o índice BM25 para os metadados carregados (só chunks novos são tokenizados) e o salva."""
+        self._write_atomic(self.lexical_path, self._get_lexical_index().save)
+
+    def _stored_keys(self):
+        return [
+            meta.get("embedding_key") or chunk_hash(self.combined_text(meta["chunk_content"], meta["context"]))
+            for meta in self.metadata
+        ]
+
+    @property
+    def embeddings(self):
+        return self._matrix[:self._size]
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        return vectors
+
+    def _reset_embeddings(self, capacity=0, dim=0):
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._size = 0
+        self._index_stale = True
+
+    def _append_embeddings(self, vectors):
+        if len(vectors) == 0:
+            return
+        # np.array sempre copia, então a normalização in-place não altera o chamador.
+        vectors = self._normalize(np.array(vectors, dtype=np.float32, ndmin=2))
+        needed = self._size + vectors.shape[0]
+        if self._matrix.shape[1] != vectors.shape[1]:
+            if self._size:
+                raise ValueError(
+                    f"Dimensão do embedding ({vectors.shape[1]}) difere da do índice ({self._matrix.shape[1]})"
+                )
+            self._reset_embeddings(self._matrix.shape[0], vectors.shape[1])
+        if needed > self._matrix.shape[0]:
+            grown = np.empty((max(needed, 2 * self._matrix.shape[0]), vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size:needed] = vectors
+        self._size = needed
+        self._index_stale = True
+
+    def _set_embeddings(self, vectors):
+        """Adota uma matriz float32 já normalizada como índice, sem cópia."""
+        self._matrix = vectors
+        self._size = vectors.shape[0]
+        self._index_stale = True
+
+    def _get_index(self):
+        if self._index_stale:
+            with telemetry.span("index_build", rows=self._size):
+                self.index.build(self.embeddings)
+            self._index_stale = False
+        return self.index
+
+    def _get_lexical_index(self):
+        if self.lexical_index is None:
+            if os.path.exists(self.lexical_path):
+                self.lexical_index = LexicalIndex.load(self.lexical_path)
+            else:
+                self.lexical_index = LexicalIndex()
+            self._lexical_stale = True
+        if self._lexical_stale:
+            # Só os chunks com chave nova são tokenizados.
+            keys = self._stored_keys()
+            if self.lexical_index.keys != keys:
+                with telemetry.span("bm25_update", rows=len(keys)):
+                    self.lexical_index.update(
+                        keys, (f"{meta['chunk_content']}\n{meta['context']}" for meta in self.metadata)
+                    )
+            self._lexical_stale = False
+        return self.lexical_index
+
+    def _get_client(self):
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    import openai
+
+                    self.client = openai.OpenAI(api_key=self.api_key if self.api_key else openai_api_key)
+        return self.client
+
+    def _embed_texts(self, texts):
+        """
+        Embeddings normalizados (matriz float32) de `texts`. Os textos já presentes no
+        cache de embeddings não vão para a API; os demais são enviados em lotes de 128.
+        """
         batch_size = 128 
-        result_embeddings = []
         total_tokens_for_batch = 0
-        
-        for i in tqdm(range(0, len(texts), batch_size), desc="Processando chunks para embedding"):
-            batch_texts = texts[i:i + batch_size]
-            response = self.client.embeddings.create(
-                input=batch_texts,
-                model="text-embedding-3-small" 
-            )
+        cached = self.embedding_cache.get_many(EMBEDDING_MODEL, texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        missing_texts = [texts[i] for i in missing]
+        new_vectors = []
+        if len(missing_texts) > batch_size:
+            from tqdm import tqdm
+            batches = tqdm(range(0, len(missing_texts), batch_size), desc="Processando chunks para embedding")
+        else:
+            batches = range(0, len(missing_texts), batch_size)
+
+        for i in batches:
+            batch_texts = missing_texts[i:i + batch_size]
+            with telemetry.span("embedding", texts=len(batch_texts)):
+                response = self._get_client().embeddings.create(
+                    input=batch_texts,
+                    model=EMBEDDING_MODEL 
+                )
+            telemetry.add_response_usage("embedding", EMBEDDING_MODEL, response)
             
-            result_embeddings.extend([res.embedding for res in response.data])
+            batch_embeddings = self._normalize(np.array([res.embedding for res in response.data], dtype=np.float32))
+            self.embedding_cache.put_many(EMBEDDING_MODEL, batch_texts, batch_embeddings)
+            new_vectors.extend(batch_embeddings)
             total_tokens_for_batch += response.usage.total_tokens
 
-        self.embeddings = result_embeddings
-        self.metadata = metadata
         self.total_tokens_used += total_tokens_for_batch
-        self.total_cost += (total_tokens_for_batch / 1_000_000) * 0.02
+        self.total_cost += usage_cost(EMBEDDING_MODEL, total_tokens_for_batch)
+        for i, vector in zip(missing, new_vectors):
+            cached[i] = vector
+        if not cached:
+            return np.empty((0, self._matrix.shape[1]), dtype=np.float32)
+        return np.array(cached, dtype=np.float32)
+
+    def documents(self):
+        """Nomes dos documentos presentes no índice (campo "document" dos metadados)."""
+        return list(self._get_document_rows())
+
+    def _get_document_rows(self):
+        if self._document_rows is None:
+            rows = {}
+            for row, meta in enumerate(self.metadata):
+                if "document" in meta:
+                    rows.setdefault(meta["document"], []).append(row)
+            self._document_rows = {document: np.array(r, dtype=np.intp) for document, r in rows.items()}
+        return self._document_rows
+
+    def _document_mask(self, documents):
+        """Máscara booleana das linhas pertencentes a `documents` (nomes desconhecidos são ignorados)."""
+        mask = np.zeros(self._size, dtype=bool)
+        document_rows = self._get_document_rows()
+        for document in documents:
+            if document in document_rows:
+                mask[document_rows[document]] = True
+        return mask
+
+    def search(self, query, k=10, similarity_threshold=0.5, use_rerank=False, rerank_top_n=1, use_hybrid=False,
+               documents=None):
+        return self.search_batch([query], k, similarity_threshold, use_rerank, rerank_top_n, use_hybrid, documents)[0]
+
+    def search_batch(self, queries, k=10, similarity_threshold=0.5, use_rerank=False, rerank_top_n=1, use_hybrid=False,
+                     documents=None):
+        """
+        Busca várias queries de uma vez: os embeddings saem em uma única requisição por lote
+        de 128, todas as queries são pontuadas com um produto matriz-matriz e os rerankings
+        rodam em paralelo. O resultado de cada query é idêntico ao de `search`.
+        Com `use_hybrid`, os candidatos densos e os do BM25 são fundidos por reciprocal rank fusion.
+        `documents` restringe a busca aos chunks desses documentos (ver ingest_stream).
+        """
+        queries = list(queries)
+        query_vectors = self._embed_texts(queries)
+
+        mask = None if documents is None else self._document_mask(documents)
+        allowed = self._size if mask is None else int(np.count_nonzero(mask))
+        if allowed == 0:
+            return [[] for _ in queries]
 
-    def search(self, query, k=10, similarity_threshold=0.5, use_rerank=False, rerank_top_n=1):
-        query_key = json.dumps({"query": query, "model": "text-embedding-3-small"}) 
-        if query_key in self.query_cache:
-            query_embedding = self.query_cache[query_key]
+        if use_hybrid:
+            candidates = min(max(k, HYBRID_CANDIDATES), allowed)
+            with telemetry.span("vector_search", queries=len(queries)):
+                hits = self._get_index().search_batch(query_vectors, candidates, mask)
+            results = [
+                self._hybrid_results(query, query_vector, indices, similarities, k, candidates, similarity_threshold, mask)
+                for query, query_vector, (indices, similarities) in zip(queries, query_vectors, hits)
+            ]
         else:
-            response = self.client.embeddings.create(
-                input=[query],
-                model="text-embedding-3-small"
-            )
-            query_embedding = response.data[0].embedding
-            self.query_cache[query_key] = query_embedding
-            
-            self.total_tokens_used += response.usage.total_tokens
-            self.total_cost += (response.usage.total_tokens / 1_000_000) * 0.02
+            with telemetry.span("vector_search", queries=len(queries)):
+                hits = self._get_index().search_batch(query_vectors, min(k, allowed), mask)
+            results = [self._format_results(indices, similarities, similarity_threshold) for indices, similarities in hits]
 
-        if not self.embeddings:
-            return []
+        if use_rerank:
+            with ThreadPoolExecutor(max_workers=min(len(queries), RERANK_MAX_WORKERS) or 1) as executor:
+                results = list(executor.map(
+                    lambda query_results: self._rerank(*query_results, rerank_top_n), zip(queries, results)
+                ))
+        return results
 
-        similarities = np.dot(np.array(self.embeddings), query_embedding)
-        
-        effective_k = min(k, len(similarities))
-        top_indices = np.argsort(similarities)[::-1][:effective_k]
+    def _format_results(self, top_indices, similarities, similarity_threshold):
+        # Os índices estão em ordem decrescente, então o filtro preserva o rank original.
+        keep = similarities >= similarity_threshold
+        top_indices, similarities = top_indices[keep], similarities[keep]
 
         results = []
-        for rank, idx in enumerate(top_indices):
-            if similarities[idx] >= similarity_threshold:
-                results.append({
-                    "chunk": self.metadata[idx]["chunk_content"],
-                    "context": self.metadata[idx]["context"],
-                    "similarity": float(similarities[idx]),
-                    "original_index": self.metadata[idx]["original_index"],
-                    "rank_after_similarity_search": rank + 1
-                })
-
-        if use_rerank and len(results) > 1:
-            docs_to_rerank = [r["chunk"] for r in results]
-            
-            cohere_client = CohereClient(os.getenv("COHERE_API_KEY"))
-            if not os.getenv("COHERE_API_KEY"):
-               
-                return results 
-            try:
-                rerank_response = cohere_client.rerank(
-                    query=query,
-                    documents=docs_to_rerank,
-                    top_n=min(rerank_top_n, len(docs_to_rerank)),
-                    model='rerank-multilingual-v3.0', 
-                    return_documents=True
-                )
-                
-                final_results_reranked = []
-                for reranked_doc_obj in rerank_response.results:
-                    original_result_for_reranked_doc = next(
-                        (res for res in results if res["chunk"] == reranked_doc_obj.document['text']),
-                        None 
-                    )
-                    if original_result_for_reranked_doc:
-                        original_result_for_reranked_doc["rerank_score"] = reranked_doc_obj.relevance_score
-                        final_results_reranked.append(original_result_for_reranked_doc)
-                
-                return final_results_reranked 
-            except cohere.CohereAPIError as e:
-                return results 
-            except Exception as e:
-                return results 
-        else:
+        for rank, (idx, similarity) in enumerate(zip(top_indices, similarities)):
+            result = {
+                "chunk": self.metadata[idx]["chunk_content"],
+                "context": self.metadata[idx]["context"],
+                "similarity": float(similarity),
+                "original_index": self.metadata[idx]["original_index"],
+                "rank_after_similarity_search": rank + 1
+            }
+            if "document" in self.metadata[idx]:
+                result["document"] = self.metadata[idx]["document"]
+            results.append(result)
+        return results
+
+    def _hybrid_results(self, query, query_vector, dense_indices, dense_similarities, k, candidates, similarity_threshold,
+                        mask=None):
+        """
+        Funde o ranking denso (já filtrado pelo limiar) com o do BM25. Acertos só lexicais
+        não passam pelo limiar: nomes e palavras raras costumam ter similaridade baixa.
+        """
+        dense_ranking = dense_indices[dense_similarities >= similarity_threshold]
+        lexical_index = self._get_lexical_index()
+        with telemetry.span("bm25"):
+            lexical_indices, lexical_scores = lexical_index.search(query, candidates, mask)
+        fused, rrf_scores = reciprocal_rank_fusion([dense_ranking, lexical_indices], RRF_K)
+        fused, rrf_scores = fused[:k], rrf_scores[:k]
+
+        similarities = self.embeddings[fused] @ query_vector
+        results = self._format_results(fused, similarities, -np.inf)
+        bm25_by_index = dict(zip(lexical_indices.tolist(), lexical_scores.tolist()))
+        for result, idx, rrf_score in zip(results, fused.tolist(), rrf_scores):
+            result["bm25_score"] = bm25_by_index.get(idx, 0.0)
+            result["rrf_score"] = float(rrf_score)
+        return results
+
+    def _get_reranker(self):
+        if self.reranker is None:
+            self.reranker = create_reranker()
+        return self.reranker
+
+    def _rerank(self, query, results, rerank_top_n):
+        if len(results) <= 1:
+            return results
+        try:
+            with telemetry.span("rerank", documents=len(results)):
+                ranked = self._get_reranker().rerank(query, [r["chunk"] for r in results], rerank_top_n)
+        except Exception as e:
+            # Sem rerank a busca continua útil: mantém a ordem da similaridade.
+            print(f"AVISO: rerank falhou ({type(e).__name__}: {e}); usando a ordem da busca vetorial.")
             return results
 
+        reranked = []
+        for position, score in ranked:
+            result = results[position]
+            result["rerank_score"] = score
+            reranked.append(result)
+        return reranked
+
+    def _write_atomic(self, path, write_fn):
+        tmp_path = f"{path}.tmp"
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+
     def save_db(self):
-        query_cache_json_str = json.dumps({k: list(v) if isinstance(v, np.ndarray) else v for k, v in self.query_cache.items()})
-        data = {
-            "embeddings": [list(e) for e in self.embeddings], 
-            "metadata": self.metadata,
-            "query_cache": query_cache_json_str, 
-            "total_tokens_used": self.total_tokens_used,
-            "total_cost": self.total_cost,
-        }
-        with open(self.db_path, "wb") as file:
-            pickle.dump(data, file)
-        
+        """
+        Grava o índice em data/{name}/: embeddings.npy (matriz float32 bruta, aberta
+        depois com memmap), metadata.json e header.json (versão e contadores).
+        O header é escrito por último e marca o índice como completo.
+        """
+        def save_npy(array):
+            def write(tmp_path):
+                with open(tmp_path, "wb") as file:
+                    np.save(file, np.ascontiguousarray(array, dtype=np.float32))
+            return write
+
+        self._write_atomic(self.embeddings_path, save_npy(self.embeddings))
+        # Uma entrada por linha: a ingestão em streaming relê os metadados sem carregá-los inteiros.
+        metadata_writer = JsonArrayWriter(self.metadata_path, field="metadata")
+        for meta in self.metadata:
+            metadata_writer.write(meta)
+        metadata_writer.commit()
+        self._write_atomic(self.lexical_path, self._get_lexical_index().save)
+        self._write_header(self._size, int(self._matrix.shape[1]))
+
+    def _write_header(self, count, dim):
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump({
+                    "format_version": DB_FORMAT_VERSION,
+                    "count": count,
+                    "dim": dim,
+                    "dtype": "float32",
+                    "model": EMBEDDING_MODEL,
+                    "total_tokens_used": self.total_tokens_used,
+                    "total_cost": self.total_cost,
+                    "source_signature": self.source_signature,
+                }, file, ensure_ascii=False)
+
+        self._write_atomic(self.header_path, write)
+
     def load_db(self):
-        if not os.path.exists(self.db_path):
-            return 
+        with telemetry.span("index_load", name=self.name):
+            self._load_db()
 
-        with open(self.db_path, "rb") as file:
+    def _load_db(self):
+        if not os.path.exists(self.header_path):
+            if os.path.exists(self.legacy_db_path):
+                self.migrate_legacy_db()
+            return
+
+        header = self._read_supported_header()
+
+        # memmap somente leitura: a carga é praticamente O(1) e processos diferentes
+        # compartilham o mesmo page cache. Inserções posteriores copiam para a RAM.
+        if header["count"]:
+            self._set_embeddings(np.load(self.embeddings_path, mmap_mode="r"))
+        else:
+            self._reset_embeddings(0, header["dim"])
+
+        with open(self.metadata_path, "r", encoding="utf-8") as file:
+            metadata_file = json.load(file)
+        self.metadata = metadata_file["metadata"]
+        self._document_rows = None
+        self.lexical_index = None
+        self.total_tokens_used = header.get("total_tokens_used", 0)
+        self.total_cost = header.get("total_cost", 0.0)
+        self.source_signature = header.get("source_signature")
+
+    def _load_legacy_pickle(self):
+        with open(self.legacy_db_path, "rb") as file:
             data = pickle.load(file)
         
-        self.embeddings = [np.array(e) for e in data.get("embeddings", [])] 
+        embeddings = data.get("embeddings", [])
+        self._reset_embeddings(len(embeddings), len(embeddings[0]) if embeddings else 0)
+        self._append_embeddings(embeddings)
         self.metadata = data.get("metadata", [])
-        query_cache_json_str = data.get("query_cache", "{}")
-        self.query_cache = {k: np.array(v) if isinstance(v, list) else v for k, v in json.loads(query_cache_json_str).items()}
+        self._document_rows = None
+        self._lexical_stale = True
+        # O antigo query_cache ({json(query, model): vetor}) vai para o EmbeddingCache.
+        by_model = {}
+        for key, vector in json.loads(data.get("query_cache", "{}")).items():
+            entry = json.loads(key)
+            queries, vectors = by_model.setdefault(entry["model"], ([], []))
+            queries.append(entry["query"])
+            vectors.append(vector)
+        for model, (queries, vectors) in by_model.items():
+            self.embedding_cache.put_many(model, queries, self._normalize(np.array(vectors, dtype=np.float32)))
         self.total_tokens_used = data.get("total_tokens_used", 0)
         self.total_cost = data.get("total_cost", 0.0)
+
+    def migrate_legacy_db(self):
+        """Converte o vector_db.pkl antigo para o formato binário. O .pkl é mantido intacto."""
+        self._load_legacy_pickle()
+        self.save_db()
         
     def validate_embeddings(self): 
         if len(self.embeddings) != len(self.metadata):
@@ -173,4 +611,18 @@ class SimpleVectorDB:
             unique_chunks = len({meta["chunk_content"] for meta in self.metadata})
             print(f"Chunks únicos (baseado em 'chunk_content'): {unique_chunks}/{len(self.metadata)}")
         else:
-            print("Metadados vazios, não é possível validar chunks únicos.")
\ No newline at end of file
+            print("Metadados vazios, não é possível validar chunks únicos.")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migra data/{name}/vector_db.pkl para o formato binário.")
+    parser.add_argument("names", nargs="+", help="Nome(s) do índice, ex.: Dom_Casmurro")
+    args = parser.parse_args()
+    for db_name in args.names:
+        vector_db = SimpleVectorDB(name=db_name)
+        if not os.path.exists(vector_db.legacy_db_path):
+            print(f"{vector_db.legacy_db_path} não encontrado.")
+            continue
+        vector_db.migrate_legacy_db()
+        print(f"{db_name}: {len(vector_db.metadata)} chunks migrados para {vector_db.db_dir}")
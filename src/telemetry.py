@@ -0,0 +1,201 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+from .configs import PROFILING, PROFILING_LOG_PATH
+
+# Preço em US$ por 1M de tokens (entrada, saída) dos modelos usados no projeto.
+MODEL_PRICES = {
+    "text-embedding-3-small": (0.02, 0.0),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Devolvido por `span` com a telemetria desligada: nenhuma medição, nenhuma alocação.
+_NULL_SPAN = nullcontext()
+
+
+def usage_cost(model, input_tokens, output_tokens=0):
+    """Custo estimado (US$) de uma chamada a `model`; 0 para modelos sem preço conhecido."""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+def _usage_tokens(response):
+    """
+    (tokens de entrada, tokens de saída) de uma resposta do SDK da OpenAI (`usage`) ou de
+    uma mensagem do LangChain (`usage_metadata`). Respostas sem uso informado contam 0.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata:
+        return usage_metadata.get("input_tokens", 0), usage_metadata.get("output_tokens", 0)
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return 0, 0
+    input_tokens = getattr(usage, "prompt_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "total_tokens", 0)
+    return input_tokens, getattr(usage, "completion_tokens", 0) or 0
+
+
+class _Span:
+    __slots__ = ("telemetry", "stage", "attrs", "start")
+
+    def __init__(self, telemetry, stage, attrs):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.telemetry._record_span(self.stage, time.perf_counter() - self.start, exc_type is not None, self.attrs)
+        return False
+
+
+class Telemetry:
+    """
+    Medições por etapa do pipeline (HyDE, embeddings, busca, rerank, LLM...): tempo das
+    spans, tokens, custo e chamadas por etapa, acertos/faltas dos caches e contadores avulsos
+    (ex.: tokens economizados no contexto). Com `enabled` falso (PROFILING em configs.py)
+    todas as operações retornam sem medir nada.
+    `log_path` grava também uma linha JSON por span (log estruturado).
+    """
+
+    def __init__(self, enabled=PROFILING, log_path=PROFILING_LOG_PATH):
+        self.enabled = enabled
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # stage -> [contagem, soma (s), máximo (s), erros]
+            self._spans = {}
+            # stage -> [chamadas, tokens de entrada, tokens de saída, custo]
+            self._usage = {}
+            # cache -> [acertos, faltas]
+            self._caches = {}
+            # nome -> total (ex.: tokens economizados no empacotamento do contexto)
+            self._counters = {}
+
+    def span(self, stage, **attrs):
+        """Context manager que mede a duração de `stage`. `attrs` só vão para o log estruturado."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, attrs)
+
+    def _record_span(self, stage, seconds, failed, attrs):
+        with self._lock:
+            stats = self._spans.setdefault(stage, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += failed
+            if self.log_path:
+                event = {"ts": time.time(), "stage": stage, "seconds": seconds, "error": failed, **attrs}
+                with open(self.log_path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def add_usage(self, stage, model, input_tokens=0, output_tokens=0, calls=1):
+        """Soma chamadas, tokens e custo estimado de `model` à etapa `stage`."""
+        if not self.enabled:
+            return
+        cost = usage_cost(model, input_tokens, output_tokens)
+        with self._lock:
+            usage = self._usage.setdefault(stage, [0, 0, 0, 0.0])
+            usage[0] += calls
+            usage[1] += input_tokens
+            usage[2] += output_tokens
+            usage[3] += cost
+
+    def add_response_usage(self, stage, model, responses):
+        """add_usage a partir de respostas da API (uma ou uma lista), lendo o uso informado nelas."""
+        if not self.enabled:
+            return
+        if not isinstance(responses, (list, tuple)):
+            responses = [responses]
+        input_tokens = output_tokens = 0
+        for response in responses:
+            tokens = _usage_tokens(response)
+            input_tokens += tokens[0]
+            output_tokens += tokens[1]
+        self.add_usage(stage, model, input_tokens, output_tokens, calls=len(responses))
+
+    def add_cache(self, cache, hits=0, misses=0):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._caches.setdefault(cache, [0, 0])
+            stats[0] += hits
+            stats[1] += misses
+
+    def add_count(self, name, value=1):
+        """Soma `value` ao contador `name`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        """Cópia dos contadores em um dicionário serializável em JSON."""
+        with self._lock:
+            return {
+                "stages": {
+                    stage: {"count": count, "total_s": total, "mean_s": total / count if count else 0.0,
+                            "max_s": peak, "errors": errors}
+                    for stage, (count, total, peak, errors) in self._spans.items()
+                },
+                "usage": {
+                    stage: {"calls": calls, "input_tokens": input_tokens, "output_tokens": output_tokens,
+                            "cost_usd": cost}
+                    for stage, (calls, input_tokens, output_tokens, cost) in self._usage.items()
+                },
+                "caches": {
+                    cache: {"hits": hits, "misses": misses,
+                            "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                    for cache, (hits, misses) in self._caches.items()
+                },
+                "counters": dict(self._counters),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, prefix="rag"):
+        """Contadores no formato texto de exposição do Prometheus."""
+        data = self.snapshot()
+        lines = []
+
+        def metric(name, kind, label, values):
+            if not values:
+                return
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for key, value in values:
+                lines.append(f'{prefix}_{name}{{{label}="{key}"}} {value}')
+
+        stages, usage, caches = data["stages"].items(), data["usage"].items(), data["caches"].items()
+        if stages:
+            lines.append(f"# TYPE {prefix}_stage_seconds summary")
+            for stage, values in stages:
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {values["total_s"]}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {values["count"]}')
+        metric("stage_seconds_max", "gauge", "stage", [(s, v["max_s"]) for s, v in stages])
+        metric("stage_errors_total", "counter", "stage", [(s, v["errors"]) for s, v in stages])
+        metric("api_calls_total", "counter", "stage", [(s, v["calls"]) for s, v in usage])
+        metric("input_tokens_total", "counter", "stage", [(s, v["input_tokens"]) for s, v in usage])
+        metric("output_tokens_total", "counter", "stage", [(s, v["output_tokens"]) for s, v in usage])
+        metric("cost_usd_total", "counter", "stage", [(s, v["cost_usd"]) for s, v in usage])
+        metric("cache_hits_total", "counter", "cache", [(c, v["hits"]) for c, v in caches])
+        metric("cache_misses_total", "counter", "cache", [(c, v["misses"]) for c, v in caches])
+        metric("cache_hit_ratio", "gauge", "cache", [(c, v["hit_rate"]) for c, v in caches])
+        for name, value in data["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Instância usada por todos os módulos do projeto.
+telemetry = Telemetry()
@@ -0,0 +1,287 @@
+import numpy as np
+
+from .configs import INDEX_BACKEND, IVF_NLIST, IVF_NPROBE, INT8_RESCORE_FACTOR, BINARY_RESCORE_FACTOR
+
+# Número de bits 1 de cada byte, para a distância de Hamming do índice binário.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def top_k(scores, k):
+    """Índices dos k maiores scores em ordem decrescente, sem ordenar o vetor inteiro."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def rescore(vectors, query, candidates, k):
+    """
+    Pontua `candidates` com a similaridade exata em float32 e devolve os k melhores.
+    A redução linha a linha é determinística: não depende do tamanho do lote de queries.
+    """
+    exact_scores = (vectors[candidates] * query).sum(axis=1)
+    best = top_k(exact_scores, min(k, len(candidates)))
+    return candidates[best], exact_scores[best]
+
+
+class VectorIndex:
+    """
+    Interface dos backends de busca do SimpleVectorDB. Os vetores recebidos em `build`
+    já estão L2-normalizados, então o score é a similaridade de cosseno (produto interno).
+    `mask` (opcional) é um vetor booleano por linha: só as linhas True podem ser retornadas.
+    """
+
+    name = None
+
+    def build(self, vectors):
+        raise NotImplementedError
+
+    def search(self, query, k, mask=None):
+        """Retorna (índices, scores) dos k vizinhos mais próximos, em ordem decrescente de score."""
+        raise NotImplementedError
+
+    def search_batch(self, queries, k, mask=None):
+        """Uma tupla (índices, scores) por linha de `queries`, idêntica à de `search`."""
+        return [self.search(query, k, mask) for query in queries]
+
+
+class ExactIndex(VectorIndex):
+    """
+    Busca exata por força bruta. As queries são pontuadas em blocos com um único produto
+    matriz-matriz; os candidatos próximos do k-ésimo score são então re-pontuados com uma
+    redução determinística, para que o resultado não dependa do tamanho do lote (gemm e
+    gemv arredondam de forma diferente).
+    """
+
+    name = "exact"
+    # Folga sobre o k-ésimo score para absorver a diferença de arredondamento entre kernels BLAS.
+    rescore_tolerance = 1e-3
+    # Limite de elementos da matriz de scores de um bloco de queries (~128 MB em float32).
+    max_block_elements = 1 << 25
+
+    def __init__(self):
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def build(self, vectors):
+        self.vectors = vectors
+
+    def search(self, query, k, mask=None):
+        return self.search_batch(query[None, :], k, mask)[0]
+
+    def search_batch(self, queries, k, mask=None):
+        block_size = max(1, self.max_block_elements // max(len(self.vectors), 1))
+        if mask is not None:
+            k = min(k, int(np.count_nonzero(mask)))
+        results = []
+        for start in range(0, len(queries), block_size):
+            block = queries[start:start + block_size]
+            for query, scores in zip(block, block @ self.vectors.T):
+                if mask is not None:
+                    scores[~mask] = -np.inf
+                results.append(self._rescore(query, scores, k))
+        return results
+
+    def _rescore(self, query, scores, k):
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        kth_score = np.partition(scores, len(scores) - k)[len(scores) - k]
+        candidates = np.flatnonzero(scores >= kth_score - self.rescore_tolerance)
+        return rescore(self.vectors, query, candidates, k)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Índice invertido (IVF) com quantização grossa por k-means esférico.
+    Cada vetor pertence à lista do centróide mais próximo; a busca compara a query com
+    os `nlist` centróides e só pontua os vetores das `nprobe` listas mais próximas.
+    `nprobe` maior aumenta o recall e o custo; `nprobe == nlist` equivale à busca exata.
+    """
+
+    name = "ivf"
+
+    def __init__(self, nlist=IVF_NLIST, nprobe=IVF_NPROBE, train_iters=10, max_train_points=256, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        # Amostra de treino do k-means: até max_train_points vetores por centróide.
+        self.max_train_points = max_train_points
+        self.seed = seed
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.centroids = np.empty((0, 0), dtype=np.float32)
+        self.list_ids = []
+
+    def _assign(self, vectors, centroids, block_size=65536):
+        assignments = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), block_size):
+            block = vectors[start:start + block_size]
+            assignments[start:start + block_size] = np.argmax(block @ centroids.T, axis=1)
+        return assignments
+
+    def _train(self, vectors, nlist):
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), nlist * self.max_train_points)
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            assignments = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = counts == 0
+            # Centróides sem pontos são reiniciados em pontos aleatórios da amostra.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        return centroids
+
+    def build(self, vectors):
+        self.vectors = vectors
+        if len(vectors) == 0:
+            self.centroids = np.empty((0, vectors.shape[1]), dtype=np.float32)
+            self.list_ids = []
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        self.centroids = self._train(vectors, nlist)
+        assignments = self._assign(vectors, self.centroids)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        self.list_ids = [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+
+    def search(self, query, k, mask=None):
+        if not self.list_ids:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        probes = top_k(self.centroids @ query, min(self.nprobe, len(self.list_ids)))
+        candidates = np.concatenate([self.list_ids[probe] for probe in probes])
+        if mask is not None:
+            # Filtro aplicado depois da sondagem: filtros muito seletivos pedem um nprobe maior.
+            candidates = candidates[mask[candidates]]
+        scores = self.vectors[candidates] @ query
+        best = top_k(scores, min(k, len(scores)))
+        return candidates[best], scores[best]
+
+
+class _QuantizedIndex(VectorIndex):
+    """
+    Base dos índices quantizados: a busca pontua os códigos compactos (em RAM), separa
+    `rescore_factor * k` candidatos e os re-pontua com os vetores float originais, que
+    podem continuar em disco via memmap — só as linhas dos candidatos são lidas.
+    """
+
+    # Limite de elementos da matriz de scores aproximados de um bloco de queries.
+    max_block_elements = 1 << 25
+    # Linhas de códigos convertidas por vez, para limitar a memória temporária.
+    code_block_rows = 32768
+
+    def __init__(self, rescore_factor):
+        self.rescore_factor = rescore_factor
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def _approx_scores(self, queries, codes):
+        """Scores aproximados (maior = mais similar) de `queries` contra um bloco de códigos."""
+        raise NotImplementedError
+
+    def search(self, query, k, mask=None):
+        return self.search_batch(query[None, :], k, mask)[0]
+
+    def search_batch(self, queries, k, mask=None):
+        n = len(self.vectors)
+        query_block_size = max(1, self.max_block_elements // max(n, 1))
+        fetch = min(n if mask is None else int(np.count_nonzero(mask)), k * self.rescore_factor)
+        results = []
+        for start in range(0, len(queries), query_block_size):
+            block = queries[start:start + query_block_size]
+            scores = np.empty((len(block), n), dtype=np.float32)
+            for row in range(0, n, self.code_block_rows):
+                codes = self.codes[row:row + self.code_block_rows]
+                scores[:, row:row + len(codes)] = self._approx_scores(block, codes)
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            for query, query_scores in zip(block, scores):
+                candidates = np.sort(top_k(query_scores, fetch))
+                results.append(rescore(self.vectors, query, candidates, k))
+        return results
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes
+
+
+class Int8Index(_QuantizedIndex):
+    """
+    Quantização escalar int8 por dimensão: cada coordenada vira
+    round((x - min_d) / scale_d) - 128. Como q·x = cte + (q * scale)·código, a ordem
+    aproximada sai direto dos códigos. Usa 1/4 da memória da matriz float32.
+    """
+
+    name = "int8"
+
+    def __init__(self, rescore_factor=INT8_RESCORE_FACTOR):
+        super().__init__(rescore_factor)
+        self.codes = np.empty((0, 0), dtype=np.int8)
+        self.scale = np.empty(0, dtype=np.float32)
+        self.offset = np.empty(0, dtype=np.float32)
+
+    def build(self, vectors):
+        self.vectors = vectors
+        if len(vectors) == 0:
+            self.codes = np.empty((0, vectors.shape[1]), dtype=np.int8)
+            return
+        self.offset = vectors.min(axis=0)
+        self.scale = (vectors.max(axis=0) - self.offset) / 255
+        self.scale[self.scale == 0] = 1.0
+        self.codes = np.empty(vectors.shape, dtype=np.int8)
+        for row in range(0, len(vectors), self.code_block_rows):
+            block = (vectors[row:row + self.code_block_rows] - self.offset) / self.scale
+            self.codes[row:row + len(block)] = np.clip(np.rint(block) - 128, -128, 127)
+
+    def _approx_scores(self, queries, codes):
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+
+class BinaryIndex(_QuantizedIndex):
+    """
+    Quantização binária: um bit de sinal por dimensão (32x menor que float32), busca
+    pela distância de Hamming. Bem mais grosseira que int8, por isso usa um
+    `rescore_factor` maior por padrão.
+    """
+
+    name = "binary"
+
+    def __init__(self, rescore_factor=BINARY_RESCORE_FACTOR):
+        super().__init__(rescore_factor)
+        self.codes = np.empty((0, 0), dtype=np.uint8)
+
+    def build(self, vectors):
+        self.vectors = vectors
+        self.codes = np.empty((len(vectors), (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+        for row in range(0, len(vectors), self.code_block_rows):
+            block = vectors[row:row + self.code_block_rows]
+            self.codes[row:row + len(block)] = np.packbits(block > 0, axis=1)
+
+    def _approx_scores(self, queries, codes):
+        query_codes = np.packbits(queries > 0, axis=1)
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for i, query_code in enumerate(query_codes):
+            hamming = _POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.int32)
+            scores[i] = -hamming
+        return scores
+
+
+INDEX_BACKENDS = {
+    ExactIndex.name: ExactIndex,
+    IVFIndex.name: IVFIndex,
+    Int8Index.name: Int8Index,
+    BinaryIndex.name: BinaryIndex,
+}
+
+
+def create_index(backend=INDEX_BACKEND, **params):
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Backend de índice desconhecido: {backend} (opções: {', '.join(INDEX_BACKENDS)})")
+    return INDEX_BACKENDS[backend](**params)